@@ -0,0 +1,78 @@
+"""Headless game runner.
+
+Usage:
+
+    python -m battlesheep --games 100 --size 8 --players random,greedy
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+import numpy as np
+
+from .engine.game_environment import GameEnvironment
+from .engine.grid import Coordinate
+from .engine.player import PLAYER_TYPES
+
+
+def read_holes(path: str) -> List[Coordinate]:
+    """Reads a hole file, with one "x y" pair per line.
+    Empty lines and lines starting with # are skipped."""
+    holes = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                x, y = line.split()
+                holes.append((int(x), int(y)))
+    return holes
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='battlesheep', description=__doc__.split('\n')[0])
+    parser.add_argument('--games', type=int, default=10, help='number of games')
+    parser.add_argument('--size', type=int, default=8, help='size of the board')
+    parser.add_argument('--holes', type=str, default=None, help='file with the holes')
+    parser.add_argument('--players', type=str, default='random,random',
+                        help='comma-separated player types: ' + ', '.join(PLAYER_TYPES))
+    parser.add_argument('--units', type=int, default=16, help='units per player')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    parser.add_argument('--fast-forward', action='store_true',
+                        help='resolve the game once the players are separated')
+    parser.add_argument('--live-view', action='store_true',
+                        help='watch the first game in a separate viewer process')
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> None:
+    args = parse_args(argv)
+    player_types = args.players.split(',')
+    for player_type in player_types:
+        if player_type not in PLAYER_TYPES:
+            raise SystemExit(f'Unknown player type: {player_type}')
+    holes = read_holes(args.holes) if args.holes else []
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+
+    totals = np.zeros(len(player_types))
+    start = time.perf_counter()
+    for i_game in range(args.games):
+        players = [PLAYER_TYPES[player_type]() for player_type in player_types]
+        env = GameEnvironment(args.size, players, None, holes,
+                              fast_forward=args.fast_forward, n_units=args.units,
+                              live_view=args.live_view and i_game == 0)
+        scores = env.play_game()
+        totals += [scores[player_id] for player_id in range(1, len(players)+1)]
+    elapsed = time.perf_counter() - start
+
+    print(f'{args.games} games in {elapsed:.2f}s '
+          f'({args.games / elapsed:.1f} games/s)')
+    for player_id, (player_type, total) in enumerate(zip(player_types, totals), 1):
+        print(f'player {player_id} ({player_type}): mean score {total / args.games:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Preallocated storage for board states, used by
+search and rollout code to avoid allocating new
+boards for every position."""
+
+from typing import Union
+
+import numpy as np
+
+from .board import Board
+
+
+class StateArena:
+    """Arena holding capacity board states in a single
+    (capacity, size, size, 2) buffer, handed out by
+    slot, plus a ring buffer with the last history
+    states pushed, used to rewind."""
+
+    def __init__(self, size: int, capacity: int, history: int = 0) -> None:
+        assert capacity >= 1 and history >= 0
+        self._size = size
+        self._capacity = capacity
+        self._history = history
+        self._buffer = np.zeros((capacity + history, size, size, 2), dtype=np.int8)
+        self._free = list(range(capacity - 1, -1, -1))
+        self._in_use = np.zeros(capacity, dtype=bool)
+        self._head = 0
+        self._n_history = 0
+
+    def get_size(self) -> int:
+        """Returns the size of the boards."""
+        return self._size
+
+    def n_free(self) -> int:
+        """Returns the number of free slots."""
+        return len(self._free)
+
+    def alloc(self) -> int:
+        """Returns a free slot. Its content is the one
+        left by its previous user."""
+        if not self._free:
+            raise MemoryError('Arena is full.')
+        slot = self._free.pop()
+        self._in_use[slot] = True
+        return slot
+
+    def free(self, slot: int) -> None:
+        """Returns the slot to the arena. Raises
+        ValueError if it is not allocated."""
+        assert 0 <= slot < self._capacity
+        if not self._in_use[slot]:
+            raise ValueError(f'Slot {slot} is not allocated.')
+        self._in_use[slot] = False
+        self._free.append(slot)
+
+    def state(self, slot: int) -> np.ndarray:
+        """Returns a view of the state in the slot."""
+        assert 0 <= slot < self._capacity
+        return self._buffer[slot]
+
+    def board(self, slot: int) -> Board:
+        """Returns a board backed by the slot. Moves on
+        the board modify the slot in place."""
+        return Board.from_state(self.state(slot))
+
+    def clone_into(self, slot: int, source: Union[int, np.ndarray, Board]) -> np.ndarray:
+        """Copies the source, given as a slot, a state or
+        a board, into the slot, and returns its view."""
+        if isinstance(source, Board):
+            source = source.get_state()
+        elif not isinstance(source, np.ndarray):
+            source = self.state(source)
+        target = self.state(slot)
+        np.copyto(target, source)
+        return target
+
+    def push_history(self, source: Union[int, np.ndarray, Board]) -> None:
+        """Stores a copy of the source in the history,
+        overwriting the oldest state if it is full."""
+        assert self._history > 0, 'Arena has no history.'
+        if isinstance(source, Board):
+            source = source.get_state()
+        elif not isinstance(source, np.ndarray):
+            source = self.state(source)
+        np.copyto(self._buffer[self._capacity + self._head], source)
+        self._head = (self._head + 1) % self._history
+        self._n_history = min(self._n_history + 1, self._history)
+
+    def history_length(self) -> int:
+        """Returns the number of states in the history."""
+        return self._n_history
+
+    def rewind(self, steps: int, slot: int = None) -> np.ndarray:
+        """Returns the state pushed steps pushes ago, with
+        steps=1 being the last one. If a slot is given,
+        the state is copied into it."""
+        assert 1 <= steps <= self._n_history, 'Not enough history.'
+        index = self._capacity + (self._head - steps) % self._history
+        if slot is None:
+            return self._buffer[index]
+        return self.clone_into(slot, self._buffer[index])
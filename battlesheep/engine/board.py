@@ -1,15 +1,19 @@
 """Classes representing the state of the board."""
 
 
-from typing import Iterator, Tuple
+import random
+from collections.abc import Sequence
+from typing import Iterator, List, Optional, Tuple
 
 import numpy as np
 
-from .grid import Coordinate, HexagonalGrid, DIRECTIONS
+from .grid import Coordinate, HexagonalGrid, DIRECTIONS, neighbour_table
 
 
 Action = Tuple[Coordinate, str]
 
+_DIRECTION_NAMES = list(DIRECTIONS)
+
 
 class Board:
     """Class representing the state of the board
@@ -19,6 +23,18 @@ class Board:
     def __init__(self, size: int, holes: Iterator[Coordinate]= None) -> None:
         self._grid = HexagonalGrid(size, holes)
 
+    @staticmethod
+    def from_state(state: np.ndarray) -> 'Board':
+        """Returns a board using the given state array as
+        storage. The array is not copied."""
+        board = Board.__new__(Board)
+        board._grid = HexagonalGrid.from_state(state)
+        return board
+
+    def copy(self) -> 'Board':
+        """Returns a copy of the board."""
+        return Board.from_state(self.get_state().copy())
+
     def get_size(self) -> int:
         """Returns the size of the grid."""
         return self._grid.get_size()
@@ -56,18 +72,112 @@ class Board:
         """Moves the player at the given coordinates."""
         self._grid.move_player(player_id, x, y, n_units, direction)
 
-    def _get_actions(self, player_id: int) -> Iterator[Action]:
-        """Returns an iterator of the actions that the
-        given player can perform."""
-        for x, y in self._grid.get_player_moveable_positions(player_id):
-            for direction in DIRECTIONS.keys():
-                nx, ny = self._grid.get_next_moveable_cell(x, y, direction)
-                if x != nx or y != ny:
+    def _free_directions(self, player_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the coordinates of the moveable stacks
+        of the player and, for each of them, a mask of the
+        directions in which it can move. A stack can move
+        in a direction iff its neighbour there is empty."""
+        state = self.get_state()
+        xs, ys = np.where((state[..., 0] == player_id) & (state[..., 1] > 1))
+        neighbours = neighbour_table(self.get_size())[xs, ys]
+        nx, ny = neighbours[..., 0], neighbours[..., 1]
+        free = (nx >= 0) & (state[nx, ny, 0] == 0)
+        return xs, ys, free
+
+    def iter_actions(self, player_id: int) -> Iterator[Action]:
+        """Yields the actions that the given player can
+        perform, without building a list."""
+        assert player_id >= 1
+        xs, ys, free = self._free_directions(player_id)
+        for x, y, directions in zip(xs.tolist(), ys.tolist(), free.tolist()):
+            for direction, is_free in zip(_DIRECTION_NAMES, directions):
+                if is_free:
                     yield (x, y), direction
 
-    def get_actions(self, player_id: int) -> Iterator[Action]:
-        """Returns an iterator of the actions that the
-        given player can perform."""
+    def count_actions(self, player_id: int) -> int:
+        """Returns the number of actions that the given
+        player can perform."""
         assert player_id >= 1
-        return [action for action in self._get_actions(player_id)]
+        return int(self._free_directions(player_id)[2].sum())
 
+    def has_any_action(self, player_id: int) -> bool:
+        """Returns True if the given player can move,
+        checking its stacks one at a time."""
+        assert player_id >= 1
+        state = self.get_state()
+        table = neighbour_table(self.get_size())
+        xs, ys = np.where((state[..., 0] == player_id) & (state[..., 1] > 1))
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            for nx, ny in table[x, y].tolist():
+                if nx >= 0 and state[nx, ny, 0] == 0:
+                    return True
+        return False
+
+    def sample_action(self, player_id: int, rng=random) -> Optional[Action]:
+        """Returns an action of the given player drawn
+        uniformly at random, or None if it cannot move.
+        The rng must provide randrange, as the random
+        module does."""
+        assert player_id >= 1
+        xs, ys, free = self._free_directions(player_id)
+        counts = free.sum(axis=1)
+        n_actions = int(counts.sum())
+        if n_actions == 0:
+            return None
+        choice = rng.randrange(n_actions)
+        stack = int(np.searchsorted(np.cumsum(counts), choice, side='right'))
+        choice -= int(counts[:stack].sum())
+        direction = np.flatnonzero(free[stack])[choice]
+        return (int(xs[stack]), int(ys[stack])), _DIRECTION_NAMES[direction]
+
+    def get_actions(self, player_id: int) -> List[Action]:
+        """Returns a list of the actions that the given
+        player can perform."""
+        return list(self.iter_actions(player_id))
+
+
+class Actions(Sequence):
+    """Lazy sequence of the actions of a player, as
+    passed to Player.calculate_move. The list of
+    actions is only built if it is indexed or iterated,
+    and sample() draws an action without building it.
+    The sequence is only valid until the board changes,
+    and is pickled as a plain list."""
+
+    def __init__(self, board: Board, player_id: int) -> None:
+        self._board = board
+        self._player_id = player_id
+        self._actions = None
+
+    def _list(self) -> List[Action]:
+        if self._actions is None:
+            self._actions = self._board.get_actions(self._player_id)
+        return self._actions
+
+    def __len__(self) -> int:
+        if self._actions is None:
+            return self._board.count_actions(self._player_id)
+        return len(self._actions)
+
+    def __bool__(self) -> bool:
+        if self._actions is None:
+            return self._board.has_any_action(self._player_id)
+        return bool(self._actions)
+
+    def __getitem__(self, index):
+        return self._list()[index]
+
+    def __iter__(self) -> Iterator[Action]:
+        return iter(self._list())
+
+    def __contains__(self, action) -> bool:
+        return action in self._list()
+
+    def __reduce__(self):
+        return list, (self._list(),)
+
+    def sample(self, rng=random) -> Action:
+        """Returns an action drawn uniformly at random."""
+        if self._actions is not None:
+            return rng.choice(self._actions)
+        return self._board.sample_action(self._player_id, rng)
@@ -0,0 +1,227 @@
+"""Exact solver for isolated regions in the endgame."""
+
+from functools import lru_cache
+from typing import FrozenSet, List, Tuple
+
+import numpy as np
+
+from .grid import DIRECTIONS
+from .regions import label_regions, region_players, greedy_solver
+
+
+Cells = Tuple[Tuple[int, int], ...]
+Stacks = Tuple[Tuple[int, int, int], ...]
+
+CACHE_SIZE = 2 ** 18
+
+_AXIAL_DIRECTIONS = [(dq, dr) for dq, dr, _ in DIRECTIONS.values()]
+
+
+def _neighbours(q: int, r: int) -> List[Tuple[int, int]]:
+    return [(q+dq, r+dr) for dq, dr in _AXIAL_DIRECTIONS]
+
+
+def _components(cells: FrozenSet[Tuple[int, int]]) -> List[set]:
+    """Returns the connected components of the cells."""
+    components, seen = [], set()
+    for cell in cells:
+        if cell in seen:
+            continue
+        component, frontier = {cell}, [cell]
+        while frontier:
+            for neighbour in _neighbours(*frontier.pop()):
+                if neighbour in cells and neighbour not in component:
+                    component.add(neighbour)
+                    frontier.append(neighbour)
+        seen |= component
+        components.append(component)
+    return components
+
+
+def _touching(stack: Tuple[int, int, int], components: List[set]) -> List[int]:
+    """Returns the components next to the stack."""
+    neighbours = _neighbours(stack[0], stack[1])
+    return [i for i, component in enumerate(components)
+        if any(neighbour in component for neighbour in neighbours)]
+
+
+def _canonical(cells: FrozenSet[Tuple[int, int]],
+               stacks: list) -> Tuple[Cells, Stacks]:
+    """Returns the signature of a region and its stacks,
+    translated so that the smallest axial coordinates
+    are zero. Stacks that cannot move any more are
+    dropped, so are the cells no stack can reach, and
+    units are capped to the most a stack can ever use:
+    one more than the cells it can reach."""
+    components = _components(frozenset(cells))
+    kept, reachable = [], set()
+    for q, r, n in stacks:
+        touching = _touching((q, r, n), components) if n > 1 else []
+        if touching:
+            reach = set().union(*(components[i] for i in touching))
+            kept.append((q, r, min(n, len(reach) + 1)))
+            reachable |= reach
+    if not kept:
+        return (), ()
+    q0 = min(min(q for q, _ in reachable), min(q for q, _, _ in kept))
+    r0 = min(min(r for _, r in reachable), min(r for _, r, _ in kept))
+    return (tuple(sorted((q-q0, r-r0) for q, r in reachable)),
+            tuple(sorted((q-q0, r-r0, n) for q, r, n in kept)))
+
+
+def _upper_bound(cells: Cells, stacks: Stacks) -> int:
+    """Every move claims one reachable cell and leaves
+    one more unit behind."""
+    return min(len(cells), sum(n - 1 for _, _, n in stacks))
+
+
+def _slide(cells: set, q: int, r: int, dq: int, dr: int) -> Tuple[int, int]:
+    while (q+dq, r+dr) in cells:
+        q, r = q+dq, r+dr
+    return q, r
+
+
+def _splits(cells: set, q: int, r: int, nq: int, nr: int, n: int) -> range:
+    """Returns the numbers of units worth moving from
+    (q, r) to (nq, nr), the destination being already
+    removed from the cells. Units left on a stack that
+    can never move again are wasted, so only the split
+    giving them all to the other stack is kept."""
+    origin_free = any(cell in cells for cell in _neighbours(q, r))
+    destination_free = any(cell in cells for cell in _neighbours(nq, nr))
+    if not origin_free:
+        return range(n - 1, n)
+    if not destination_free:
+        return range(1, 2)
+    return range(1, n)
+
+
+def _greedy(cells: Cells, stacks: Stacks) -> int:
+    """Returns the cells claimed by filling the cells
+    with few free neighbours first, halving the stacks.
+    This is a lower bound of _solve."""
+    cells, stacks = set(cells), list(stacks)
+    claimed = 0
+    while True:
+        best = None
+        for i, (q, r, n) in enumerate(stacks):
+            if n < 2:
+                continue
+            for dq, dr in _AXIAL_DIRECTIONS:
+                nq, nr = _slide(cells, q, r, dq, dr)
+                if (nq, nr) != (q, r):
+                    freedom = sum(cell in cells for cell in _neighbours(nq, nr))
+                    if best is None or freedom < best[0]:
+                        best = (freedom, i, nq, nr)
+        if best is None:
+            return claimed
+        _, i, nq, nr = best
+        q, r, n = stacks[i]
+        cells.discard((nq, nr))
+        splits = _splits(cells, q, r, nq, nr, n)
+        n_units = splits[len(splits) // 2]
+        stacks[i] = (q, r, n - n_units)
+        stacks.append((nq, nr, n_units))
+        claimed += 1
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _solve(cells: Cells, stacks: Stacks) -> int:
+    """Returns the maximum number of cells the stacks
+    can claim in the region, by branch and bound:
+    independent components are solved separately, the
+    greedy solution is the initial lower bound, and
+    children whose upper bound cannot beat it are
+    skipped."""
+    if not stacks:
+        return 0
+    cell_set = frozenset(cells)
+    components = _components(cell_set)
+    if len(components) > 1:
+        groups = [[] for _ in components]
+        for stack in stacks:
+            touching = _touching(stack, components)
+            if len(touching) > 1:
+                break
+            groups[touching[0]].append(stack)
+        else:
+            return sum(_solve(*_canonical(component, group))
+                for component, group in zip(components, groups))
+
+    bound = _upper_bound(cells, stacks)
+    best = _greedy(cells, stacks)
+    if best >= bound:
+        return bound
+
+    children = set()
+    for i, (q, r, n) in enumerate(stacks):
+        others = list(stacks[:i] + stacks[i+1:])
+        for dq, dr in _AXIAL_DIRECTIONS:
+            nq, nr = _slide(cell_set, q, r, dq, dr)
+            if (nq, nr) == (q, r):
+                continue
+            remaining = cell_set - {(nq, nr)}
+            for n_units in _splits(remaining, q, r, nq, nr, n):
+                child = others + [(q, r, n - n_units), (nq, nr, n_units)]
+                children.add(_canonical(remaining, child))
+
+    for child_bound, child in sorted(((_upper_bound(*child), child) for child in children),
+                                     reverse=True):
+        if 1 + child_bound <= best:
+            break
+        best = max(best, 1 + _solve(*child))
+        if best == bound:
+            break
+    return best
+
+
+def _to_axial(size: int, mask: np.ndarray) -> Tuple[list, list]:
+    """Returns the axial coordinates of the cells in
+    the mask, as in HexagonalGrid.to_cube."""
+    x, y = np.where(mask)
+    x, y = x - size // 2, y - size // 2
+    return (y - (x - (x & 1)) // 2).tolist(), x.tolist()
+
+
+def region_signature(state: np.ndarray, player_id: int) -> Tuple[Cells, Stacks]:
+    """Returns the canonical signature of the empty
+    cells the player can still reach and of its
+    moveable stacks, in axial coordinates."""
+    labels, _ = label_regions(state)
+    regions = [region for region, players in region_players(state, labels).items()
+        if player_id in players]
+    cells = frozenset(zip(*_to_axial(state.shape[0], np.isin(labels, regions))))
+    mask = state[..., 0] == player_id
+    stacks = list(zip(*_to_axial(state.shape[0], mask), state[..., 1][mask].tolist()))
+    return _canonical(cells, stacks)
+
+
+def solve_region(state: np.ndarray, player_id: int, max_cells: int = 20) -> int:
+    """Returns the exact number of cells the player can
+    still claim, assuming the regions it touches are
+    not reachable by other players. Raises ValueError
+    if the regions have more than max_cells cells."""
+    cells, stacks = region_signature(state, player_id)
+    if len(cells) > max_cells:
+        raise ValueError('Region too large for the exact solver.')
+    return _solve(cells, stacks)
+
+
+def exact_solver(state: np.ndarray, player_id: int, max_cells: int = 20) -> int:
+    """Solver for GameEnvironment fast-forwarding. Uses
+    the exact solver on small regions and the greedy
+    solver on larger ones."""
+    try:
+        return solve_region(state, player_id, max_cells)
+    except ValueError:
+        return greedy_solver(state, player_id)
+
+
+def cache_info():
+    """Returns the statistics of the solver cache."""
+    return _solve.cache_info()
+
+
+def clear_cache() -> None:
+    """Empties the solver cache."""
+    _solve.cache_clear()
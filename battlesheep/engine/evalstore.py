@@ -0,0 +1,202 @@
+"""Persistent store of position evaluations, keyed by
+the canonical hash of the state and the player to
+move.
+
+The store is a directory with two files:
+
+    - log.bin: write-ahead log where new evaluations
+      are appended.
+    - index.bin: records sorted by key, searched by
+      bisection through a memory map.
+
+compact() merges the log into the index. Recently
+used entries are kept in an in-memory LRU cache."""
+
+import hashlib
+import os
+from collections import OrderedDict, namedtuple
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .grid import DIRECTIONS
+from .symmetry import canonical_form
+
+
+Entry = namedtuple('Entry', ['value', 'depth', 'move'])
+
+RECORD_DTYPE = np.dtype([
+    ('hi', '<u8'), ('lo', '<u8'),
+    ('value', '<f8'), ('depth', '<i4'),
+    ('q', '<i2'), ('r', '<i2'), ('direction', 'i1'), ('n_units', 'i1'),
+])
+
+_DIRECTION_NAMES = list(DIRECTIONS)
+
+
+def position_key(state: np.ndarray, to_move: int) -> Tuple[Tuple[int, int], object]:
+    """Returns the key of the position as two 64-bit
+    integers, and its canonical form."""
+    form = canonical_form(state)
+    digest = hashlib.blake2b(form.key + bytes([to_move]), digest_size=16).digest()
+    return (int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big')), form
+
+
+class EvaluationStore:
+    """On-disk store of the value, best move and search
+    depth of positions. A position evaluated at a lower
+    depth than the stored one is ignored."""
+
+    def __init__(self, path: str, cache_size: int = 2 ** 16, sync: bool = False) -> None:
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.cache_size = cache_size
+        self.sync = sync
+        self._cache = OrderedDict()
+        self._log = {}
+        self._index = None
+        self._load()
+        self._log_file = open(self._log_path, 'ab')
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.path, 'log.bin')
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, 'index.bin')
+
+    def _load(self) -> None:
+        """Loads the log and maps the index."""
+        if os.path.exists(self._log_path):
+            data = open(self._log_path, 'rb').read()
+            # Drop a record partially written before a crash,
+            # so that new records are appended after the last
+            # complete one
+            n_records = len(data) // RECORD_DTYPE.itemsize
+            if len(data) != n_records * RECORD_DTYPE.itemsize:
+                os.truncate(self._log_path, n_records * RECORD_DTYPE.itemsize)
+            records = np.frombuffer(data[:n_records * RECORD_DTYPE.itemsize],
+                                    dtype=RECORD_DTYPE)
+            for record in records:
+                self._remember(record.copy())
+        if os.path.exists(self._index_path) and os.path.getsize(self._index_path):
+            self._index = np.memmap(self._index_path, dtype=RECORD_DTYPE, mode='r')
+
+    def _remember(self, record: np.void) -> None:
+        key = (int(record['hi']), int(record['lo']))
+        current = self._log.get(key)
+        if current is None or record['depth'] >= current['depth']:
+            self._log[key] = record
+
+    def __len__(self) -> int:
+        n_index = 0 if self._index is None else len(self._index)
+        return n_index + sum(1 for key in self._log if self._search_index(key) is None)
+
+    def _search_index(self, key: Tuple[int, int]) -> Optional[np.void]:
+        """Searches the sorted index by bisection."""
+        if self._index is None:
+            return None
+        hi, lo = key
+        start = np.searchsorted(self._index['hi'], np.uint64(hi), side='left')
+        end = np.searchsorted(self._index['hi'], np.uint64(hi), side='right')
+        if start == end:
+            return None
+        i = start + np.searchsorted(self._index['lo'][start:end], np.uint64(lo))
+        if i < end and self._index['lo'][i] == lo:
+            return self._index[i]
+        return None
+
+    def _find(self, key: Tuple[int, int]) -> Optional[np.void]:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        record = self._log.get(key)
+        if record is None:
+            record = self._search_index(key)
+        if record is not None:
+            self._cache_put(key, record)
+        return record
+
+    def _cache_put(self, key: Tuple[int, int], record: np.void) -> None:
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, state: np.ndarray, to_move: int) -> Optional[Entry]:
+        """Returns the stored evaluation of the position,
+        with the best move mapped to the given state, or
+        None if the position is not stored."""
+        key, form = position_key(state, to_move)
+        record = self._find(key)
+        if record is None:
+            return None
+        move = None
+        if record['n_units'] > 0:
+            x, y = form.from_canonical(int(record['q']), int(record['r']))
+            direction = form.direction_from_canonical(_DIRECTION_NAMES[record['direction']])
+            move = ((x, y), direction, int(record['n_units']))
+        return Entry(float(record['value']), int(record['depth']), move)
+
+    def put(self, state: np.ndarray, to_move: int, value: float, depth: int,
+            move: Tuple[Tuple[int, int], str, int] = None) -> None:
+        """Stores the evaluation of the position, unless
+        it is already stored with a larger depth."""
+        key, form = position_key(state, to_move)
+        current = self._find(key)
+        if current is not None and current['depth'] > depth:
+            return
+
+        record = np.zeros((), dtype=RECORD_DTYPE)
+        record['hi'], record['lo'] = key
+        record['value'], record['depth'] = value, depth
+        if move is not None:
+            (x, y), direction, n_units = move
+            record['q'], record['r'] = form.to_canonical(x, y)
+            record['direction'] = _DIRECTION_NAMES.index(
+                form.direction_to_canonical(direction))
+            record['n_units'] = n_units
+        self._log_file.write(record.tobytes())
+        self._log_file.flush()
+        if self.sync:
+            os.fsync(self._log_file.fileno())
+        record = record[()]
+        self._remember(record)
+        self._cache_put(key, record)
+
+    def compact(self) -> None:
+        """Merges the log into the sorted index and
+        empties the log."""
+        records = np.array(list(self._log.values()), dtype=RECORD_DTYPE)
+        if self._index is not None:
+            records = np.concatenate([np.asarray(self._index), records])
+        # Keep the deepest evaluation of every key, the log winning ties
+        order = np.lexsort((records['depth'], records['lo'], records['hi']))
+        records = records[order]
+        last = np.ones(len(records), dtype=bool)
+        last[:-1] = (records['hi'][1:] != records['hi'][:-1]) | \
+                    (records['lo'][1:] != records['lo'][:-1])
+        records = records[last]
+
+        tmp_path = self._index_path + '.tmp'
+        records.tofile(tmp_path)
+        self._index = None
+        os.replace(tmp_path, self._index_path)
+        self._log_file.close()
+        self._log_file = open(self._log_path, 'wb')
+        self._log = {}
+        self._cache.clear()
+        if len(records):
+            self._index = np.memmap(self._index_path, dtype=RECORD_DTYPE, mode='r')
+
+    def close(self) -> None:
+        """Closes the store."""
+        self._log_file.close()
+        self._index = None
+
+    def __enter__(self) -> 'EvaluationStore':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,142 @@
+"""Vectorized evaluation of candidate moves. The
+child positions of a batch of moves are built and
+scored at once with NumPy."""
+
+from typing import Callable, Sequence
+
+import numpy as np
+
+from .grid import DIRECTIONS
+from .layout import REGISTRY
+
+
+FEATURES = ('mobility', 'cells', 'territory', 'frontier')
+
+DEFAULT_WEIGHTS = (0.1, 1.0, 0.5, -0.1)
+
+Scorer = Callable[[np.ndarray], np.ndarray]
+
+_DIRECTION_INDEX = {direction: i for i, direction in enumerate(DIRECTIONS)}
+
+
+def _tables(size: int):
+    """Returns the flat neighbour table, with a
+    sentinel cell at index size * size, and the static
+    rays of every cell, from the layout registry."""
+    layout = REGISTRY.get(size)
+    return layout.neighbours, layout.rays
+
+
+def _pad(flat: np.ndarray, value) -> np.ndarray:
+    """Appends the sentinel cell to flat boards."""
+    padding = np.full(flat.shape[:-1] + (1,), value, dtype=flat.dtype)
+    return np.concatenate([flat, padding], axis=-1)
+
+
+def ray_lengths(states: np.ndarray) -> np.ndarray:
+    """Returns the number of empty cells a stack could
+    slide through from every cell in every direction,
+    for a batch of states. Output has shape
+    (batch, size, size, 6)."""
+    batch, size = states.shape[:2]
+    _, rays = _tables(size)
+    empty = _pad(states[..., 0].reshape(batch, -1) == 0, False)
+    lengths = np.cumprod(empty[:, rays], axis=-1).sum(axis=-1)
+    return lengths.reshape(batch, size, size, -1)
+
+
+def apply_moves(states: np.ndarray, parents: np.ndarray, origins: np.ndarray,
+                directions: Sequence, n_units: np.ndarray) -> np.ndarray:
+    """Returns the child states reached by the moves.
+    Move i is made from states[parents[i]], moving
+    n_units[i] units from origins[i] in directions[i].
+    All the moves must be legal."""
+    size = states.shape[1]
+    _, rays = _tables(size)
+    parents = np.asarray(parents)
+    origins = np.asarray(origins).reshape(-1, 2)
+    n_units = np.asarray(n_units)
+    directions = np.array([_DIRECTION_INDEX.get(d, d) for d in directions], dtype=np.int64)
+
+    children = states[parents].copy()
+    moves = np.arange(len(parents))
+    xs, ys = origins[:, 0], origins[:, 1]
+    lengths = ray_lengths(states)[parents, xs, ys, directions]
+    assert (lengths > 0).all(), 'Illegal move.'
+    assert ((n_units >= 1) & (n_units < children[moves, xs, ys, 1])).all(), 'Illegal split.'
+
+    destinations = rays[xs * size + ys, directions, lengths - 1]
+    nx, ny = destinations // size, destinations % size
+    players = children[moves, xs, ys, 0]
+    children[moves, xs, ys, 1] -= n_units.astype(np.int8)
+    children[moves, nx, ny, 0] = players
+    children[moves, nx, ny, 1] = n_units
+    return children
+
+
+def compute_features(states: np.ndarray, player_ids: np.ndarray) -> np.ndarray:
+    """Returns the features of each state from the
+    point of view of the given player, in the order of
+    FEATURES:
+
+        - mobility: sum of the ray lengths of the
+          moveable stacks of the player.
+        - cells: number of cells owned.
+        - territory: empty cells reachable by the
+          moveable stacks of the player.
+        - frontier: empty cells next to both the player
+          and an opponent."""
+    batch, size = states.shape[:2]
+    neighbours, _ = _tables(size)
+    player_ids = np.asarray(player_ids).reshape(batch, 1, 1)
+    owner, units = states[..., 0], states[..., 1]
+    own = owner == player_ids
+    moveable = own & (units > 1)
+
+    mobility = (ray_lengths(states).sum(axis=-1) * moveable).sum(axis=(1, 2))
+    cells = own.sum(axis=(1, 2))
+
+    empty = (owner == 0).reshape(batch, -1)
+
+    def touching(mask):
+        return _pad(mask.reshape(batch, -1), False)[:, neighbours[:-1]].any(axis=-1)
+
+    reach = empty & touching(moveable)
+    while True:
+        new_reach = reach | (empty & touching(reach))
+        if (new_reach == reach).all():
+            break
+        reach = new_reach
+    territory = reach.sum(axis=1)
+
+    opponent = (owner > 0) & ~own
+    frontier = (empty & touching(own) & touching(opponent)).sum(axis=1)
+    return np.stack([mobility, cells, territory, frontier], axis=1).astype(np.float64)
+
+
+class LinearScorer:
+    """Scores features with a weighted sum."""
+
+    def __init__(self, weights: Sequence[float] = DEFAULT_WEIGHTS) -> None:
+        assert len(weights) == len(FEATURES)
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        return features @ self.weights
+
+
+def evaluate_moves(states: np.ndarray, parents: np.ndarray, origins: np.ndarray,
+                   directions: Sequence, n_units: np.ndarray,
+                   scorer: Scorer = None) -> np.ndarray:
+    """Evaluates the child positions of a batch of moves
+    from the point of view of the player making each
+    move. Returns the features of the children if no
+    scorer is given, and their scores otherwise."""
+    states = np.asarray(states)
+    if states.ndim == 3:
+        states = states[None]
+    origins = np.asarray(origins).reshape(-1, 2)
+    players = states[np.asarray(parents), origins[:, 0], origins[:, 1], 0]
+    children = apply_moves(states, parents, origins, directions, n_units)
+    features = compute_features(children, players)
+    return features if scorer is None else scorer(features)
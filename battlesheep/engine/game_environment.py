@@ -1,33 +1,86 @@
 """Main game engine."""
 
+import threading
 from typing import Iterator, List
 
 import numpy as np
 
 from .player import Player
-from .board import Board, Action, Coordinate
-from ..graphics.gui import BoardGUI
+from .board import Board, Action, Actions, Coordinate
+from .placement import legal_start_cells
+from .publisher import StatePublisher, launch_viewer
+from .regions import is_separated, resolve_scores, greedy_solver, Solver
 
 
 class GameEnvironment:
 
     def __init__(self, size: int, players: List[Player],
-    init_dict: dict, holes: Iterator[Coordinate], gui: bool = False) -> None:
+    init_dict: dict, holes: Iterator[Coordinate], gui: bool = False,
+    fast_forward: bool = False, solver: Solver = greedy_solver,
+    n_units: int = 16, live_view: bool = False, fps: float = 10.0) -> None:
         self.board = Board(size, holes)
         self.n_players = len(players)
         self.players = players
         self.init_dict = init_dict
+        self.n_units = n_units
+        self.fast_forward = fast_forward
+        self.solver = solver
 
         self._initialised = False
-        self._gui = BoardGUI(self.board) if gui else None
+        self._gui = None
+        if gui:
+            # Imported lazily so that headless games do not load matplotlib
+            from ..graphics.gui import BoardGUI
+            self._gui = BoardGUI(self.board)
+        # With live_view, the states are published in shared memory
+        # and drawn by a viewer process, without blocking the game
+        self._publisher, self._viewer = None, None
+        if live_view:
+            self._publisher = StatePublisher(size)
+            self._viewer = launch_viewer(self._publisher.name, fps)
 
     def _initialise(self):
-        """Initialises the game."""
-        for player_id, (x, y, n_units) in self.init_dict.items():
-            self.board.initialize_player(player_id, x, y, n_units)
+        """Initialises the game. Without an init_dict,
+        the players place their starting stacks of
+        n_units units in turn on the perimeter."""
+        if self.init_dict is None:
+            self.init_dict = self._placement_phase()
+        else:
+            for player_id, (x, y, n_units) in self.init_dict.items():
+                self.board.initialize_player(player_id, x, y, n_units)
+        self._show()
+        self._initialised = True
+
+    def _placement_phase(self) -> dict:
+        """Lets every player place its starting stack.
+        Returns the resulting init_dict."""
+        init_dict = {}
+        for player_id in range(1, self.n_players+1):
+            state = self._get_state()
+            cells = legal_start_cells(state)
+            x, y = self.players[player_id-1].calculate_placement(state, cells)
+            assert (x, y) in cells, 'Illegal placement.'
+            self.board.initialize_player(player_id, x, y, self.n_units)
+            init_dict[player_id] = (x, y, self.n_units)
+        return init_dict
+
+    def _show(self) -> None:
+        """Shows the current state of the board."""
         if self._gui:
             self._gui.update_view(self.board)
-        self._initialised = True
+        if self._publisher:
+            self._publisher.publish(self._get_state())
+
+    def close(self) -> None:
+        """Stops publishing the live view, if any. The
+        buffer is handed over to the viewer if it attached,
+        so that it shows the final state without the game
+        waiting for it, and unlinked otherwise."""
+        if self._publisher:
+            self._publisher.close(unlink=self._publisher.n_readers == 0)
+            self._publisher = None
+            # Reap the viewer once its window is closed
+            threading.Thread(target=self._viewer.wait, daemon=True).start()
 
     def _get_state(self) -> np.ndarray:
         """Returns the state of the board."""
@@ -50,8 +103,10 @@ class GameEnvironment:
         self.board.move_player(player_id, x, y, n_units, direction)
 
     def _finished(self):
-        """Returns True if the game is finished."""
-        return len(self._get_actions(1)) == 0
+        """Returns True if the game is finished,
+        i.e. no player can move any more."""
+        return not any(self.board.has_any_action(player_id)
+            for player_id in range(1, self.n_players+1))
 
     def play_turn(self):
         """Plays a round of turns by all players."""
@@ -61,16 +116,26 @@ class GameEnvironment:
         for player_id in range(1, len(self.players)+1):
             player = self.players[player_id-1]
             state = self._get_state()
-            actions = self._get_actions(player_id)
+            actions = Actions(self.board, player_id)
+            if not actions:
+                # Players that cannot move skip their turn
+                continue
             (x, y), direction, n_units = player.calculate_move(state, actions)
             self._make_move(player_id, x, y, n_units, direction)
-            if self._gui:
-                self._gui.update_view(self.board)
+            self._show()
 
     def play_game(self):
-        """Plays a game."""
+        """Plays a game. If fast_forward is set, the game
+        stops as soon as the players cannot interact any
+        more, and the remaining regions are resolved by
+        the solver."""
         if not self._initialised:
             self._initialise()
-        while not self._finished():
-            self.play_turn()
-        return self._get_scores()
+        try:
+            while not self._finished():
+                if self.fast_forward and is_separated(self._get_state()):
+                    return resolve_scores(self._get_state(), self.n_players, self.solver)
+                self.play_turn()
+            return self._get_scores()
+        finally:
+            self.close()
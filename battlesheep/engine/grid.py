@@ -1,6 +1,7 @@
 """Class implementing a hexagonal grid with
 axial coordinates."""
 
+from functools import lru_cache
 from typing import Tuple, Iterator
 
 import numpy as np
@@ -44,6 +45,21 @@ class HexagonalGrid:
         """Returns the state of the grid."""
         return self._grid
 
+    @staticmethod
+    def from_state(state: np.ndarray) -> 'HexagonalGrid':
+        """Returns a grid using the given state array as
+        storage. The array is not copied."""
+        assert state.ndim == 3 and state.shape[0] == state.shape[1]
+        assert state.dtype == np.int8
+        grid = HexagonalGrid.__new__(HexagonalGrid)
+        grid._size = state.shape[0]
+        grid._grid = state
+        return grid
+
+    def copy(self) -> 'HexagonalGrid':
+        """Returns a copy of the grid."""
+        return HexagonalGrid.from_state(self._grid.copy())
+
     def get_score(self, player_id: int) -> int:
         """Returns the score of the grid."""
         return (self._grid[:, :, 0] == player_id).sum()
@@ -194,3 +210,22 @@ class HexagonalGrid:
         self._grid[x, y, 1] -= n_units
         self._grid[nx, ny, 0] = player_id
         self._grid[nx, ny, 1] = n_units
+
+
+@lru_cache(maxsize=None)
+def neighbour_table(size: int) -> np.ndarray:
+    """Returns an array of shape size x size x 6 x 2
+    with the offset coordinates of the neighbours of
+    every cell, in the order of DIRECTIONS. Neighbours
+    out of bounds are set to (-1, -1). The array is
+    shared between callers and must not be modified."""
+    grid = HexagonalGrid(size)
+    table = -np.ones((size, size, len(DIRECTIONS), 2), dtype=np.int64)
+    for x in range(size):
+        for y in range(size):
+            q, r, s = grid.to_cube(x, y)
+            for i, (dq, dr, ds) in enumerate(DIRECTIONS.values()):
+                if not grid._out_of_bounds_cube(q+dq, r+dr, s+ds):
+                    table[x, y, i] = grid.to_offset(q+dq, r+dr, s+ds)
+    table.flags.writeable = False
+    return table
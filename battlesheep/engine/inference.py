@@ -0,0 +1,186 @@
+"""Batched inference for players using a model to
+evaluate positions. Requests from many games or
+threads are gathered into batches before running
+the model."""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Sequence, Tuple
+
+import numpy as np
+
+from .grid import DIRECTIONS
+from .player import Player
+
+
+N_CHANNELS = 4
+
+
+def encode_observation(state: np.ndarray, player_id: int) -> np.ndarray:
+    """Encodes the state, as returned by
+    HexagonalGrid.get_state, from the point of view of
+    the player. The channels are the units of the
+    player, the units of its opponents, the empty cells
+    and the holes. Output has shape size x size x 4."""
+    owner, units = state[..., 0], state[..., 1].astype(np.float32) / 16
+    observation = np.empty(state.shape[:2] + (N_CHANNELS,), dtype=np.float32)
+    observation[..., 0] = np.where(owner == player_id, units, 0)
+    observation[..., 1] = np.where((owner > 0) & (owner != player_id), units, 0)
+    observation[..., 2] = owner == 0
+    observation[..., 3] = owner == -1
+    return observation
+
+
+class NumpyMLP:
+    """Reference multilayer perceptron with a value
+    head and a policy head over (cell, direction)
+    pairs, evaluated with NumPy."""
+
+    def __init__(self, size: int, hidden_sizes: Sequence[int] = (64,),
+                 seed: int = None) -> None:
+        rng = np.random.default_rng(seed)
+        self.size = size
+        self.n_actions = size * size * len(DIRECTIONS)
+        sizes = [size * size * N_CHANNELS] + list(hidden_sizes)
+        self.layers = [(rng.normal(0, 1 / np.sqrt(n_in), (n_in, n_out)).astype(np.float32),
+                        np.zeros(n_out, dtype=np.float32))
+            for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+        self.value_head = rng.normal(0, 1 / np.sqrt(sizes[-1]), (sizes[-1], 1)).astype(np.float32)
+        self.policy_head = rng.normal(0, 1 / np.sqrt(sizes[-1]),
+                                      (sizes[-1], self.n_actions)).astype(np.float32)
+
+    def __call__(self, observations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the values and the policy logits of a
+        batch of observations."""
+        hidden = observations.reshape(len(observations), -1)
+        for weights, bias in self.layers:
+            hidden = np.maximum(hidden @ weights + bias, 0)
+        values = np.tanh(hidden @ self.value_head)[:, 0]
+        return values, hidden @ self.policy_head
+
+
+class InferenceBroker:
+    """Runs the model on batches of observations in a
+    background thread. A batch is run as soon as it
+    holds max_batch_size observations, or max_latency
+    seconds after its first observation arrived."""
+
+    def __init__(self, model: Callable, max_batch_size: int = 64,
+                 max_latency: float = 0.002) -> None:
+        assert max_batch_size >= 1
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.n_batches = 0
+        self.n_requests = 0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        # Orders submissions before the stop sentinel
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, observation: np.ndarray) -> Future:
+        """Submits an observation. Returns a future with
+        the model outputs for it."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Broker is closed.')
+            self._queue.put((observation, future))
+        return future
+
+    def close(self) -> None:
+        """Stops the broker after the pending requests."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self) -> 'InferenceBroker':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _gather(self, first) -> Tuple[list, bool]:
+        """Gathers a batch starting with the given
+        request. Returns the batch and whether the
+        broker was closed meanwhile."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        closed = False
+        while not closed:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch, closed = self._gather(item)
+            # Observations of different shapes, e.g. from
+            # boards of different sizes, are run separately
+            by_shape = {}
+            for observation, future in batch:
+                by_shape.setdefault(np.shape(observation), []).append((observation, future))
+            for requests in by_shape.values():
+                self._run_batch(requests)
+
+    def _run_batch(self, batch: list) -> None:
+        """Runs the model on a batch of observations of
+        the same shape and sets the futures. Requests
+        cancelled meanwhile are dropped."""
+        batch = [(observation, future) for observation, future in batch
+            if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            outputs = self.model(np.stack([observation for observation, _ in batch]))
+            if isinstance(outputs, tuple):
+                results = [tuple(output[i] for output in outputs) for i in range(len(batch))]
+            else:
+                results = [outputs[i] for i in range(len(batch))]
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.n_batches += 1
+        self.n_requests += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+class NetworkPlayer(Player):
+    """Player choosing the legal action with the
+    highest policy logit, evaluated through the
+    broker. It moves half of the units of the stack."""
+
+    def __init__(self, broker: InferenceBroker) -> None:
+        self.broker = broker
+
+    def calculate_move(self, state, actions):
+        """Calculates the move to make."""
+        (x, y), _ = actions[0]
+        player_id = state[x, y, 0]
+        _, logits = self.broker.submit(encode_observation(state, player_id)).result()
+        size = state.shape[0]
+        directions = list(DIRECTIONS)
+        scores = [logits[(ax * size + ay) * len(directions) + directions.index(direction)]
+            for (ax, ay), direction in actions]
+        (x, y), direction = actions[int(np.argmax(scores))]
+        return (x, y), direction, max(state[x, y, 1] // 2, 1)
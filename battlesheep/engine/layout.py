@@ -0,0 +1,259 @@
+"""Registry of the static data of board layouts.
+Everything that depends only on the size of the board
+and its holes is computed once per layout, and can be
+shared read-only with worker processes through shared
+memory."""
+
+import atexit
+import hashlib
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, NamedTuple, Union
+
+import numpy as np
+
+from .grid import Coordinate, neighbour_table, DIRECTIONS
+from .symmetry import N_SYMMETRIES, transform_cube
+
+
+class LayoutHandle(NamedTuple):
+    """Picklable reference to a layout in shared memory."""
+    key: str
+    size: int
+    shm_name: str
+
+
+def _array_specs(size: int) -> List[tuple]:
+    """Returns the name, dtype and shape of the arrays
+    of a layout, in the order they are stored."""
+    n_cells = size * size
+    return [
+        ('holes', np.bool_, (size, size)),
+        ('neighbours', np.int64, (n_cells + 1, len(DIRECTIONS))),
+        ('rays', np.int64, (n_cells, len(DIRECTIONS), size)),
+        ('perimeter', np.bool_, (size, size)),
+        ('symmetries', np.bool_, (N_SYMMETRIES,)),
+        ('pixels', np.float64, (size, size, 2)),
+    ]
+
+
+def layout_key(size: int, holes: np.ndarray) -> str:
+    """Returns the key of a layout: a hash of its size
+    and hole mask."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(size.to_bytes(4, 'little'))
+    digest.update(np.packbits(holes).tobytes())
+    return digest.hexdigest()
+
+
+class Layout:
+    """Static data of a board layout:
+
+        - holes: mask of the holes.
+        - neighbours: flat index of the neighbours of
+          every cell, in the order of DIRECTIONS, with a
+          sentinel cell size * size for out of bounds.
+        - rays: flat index of the k-th cell from every
+          cell in every direction, ignoring the stacks.
+        - perimeter: cells on the outer boundary.
+        - symmetries: which of the symmetries of the
+          grid map the layout onto itself.
+        - pixels: centre of every cell when rendered.
+
+    The arrays are read-only."""
+
+    def __init__(self, key: str, size: int, arrays: Dict[str, np.ndarray],
+                 shm: shared_memory.SharedMemory = None) -> None:
+        self.key = key
+        self.size = size
+        self._shm = shm
+        for name, array in arrays.items():
+            array.flags.writeable = False
+            setattr(self, name, array)
+
+    def symmetry_group(self) -> List[int]:
+        """Returns the symmetries preserving the layout."""
+        return [int(i) for i in np.flatnonzero(self.symmetries)]
+
+    @staticmethod
+    def compute(size: int, holes: np.ndarray) -> 'Layout':
+        """Computes the static data of the layout."""
+        holes = np.asarray(holes, dtype=bool)
+        n_cells = size * size
+        table = neighbour_table(size)
+        neighbours = table[..., 0] * size + table[..., 1]
+        neighbours[table[..., 0] < 0] = n_cells
+        neighbours = np.vstack([neighbours.reshape(n_cells, -1),
+                                np.full((1, len(DIRECTIONS)), n_cells)])
+
+        rays = np.empty((n_cells, len(DIRECTIONS), size), dtype=np.int64)
+        current = neighbours[:-1]
+        for k in range(size):
+            rays[..., k] = current
+            current = neighbours[current, np.arange(len(DIRECTIONS))]
+
+        arrays = {
+            'holes': holes,
+            'neighbours': neighbours,
+            'rays': rays,
+            'perimeter': _perimeter(holes, neighbours),
+            'symmetries': _symmetries(size, holes),
+            'pixels': _pixels(size),
+        }
+        return Layout(layout_key(size, holes), size, arrays)
+
+    def close(self) -> None:
+        """Releases the shared memory, if attached."""
+        if self._shm is not None:
+            for name, _, _ in _array_specs(self.size):
+                delattr(self, name)
+            self._shm.close()
+            self._shm = None
+
+
+def _perimeter(holes: np.ndarray, neighbours: np.ndarray) -> np.ndarray:
+    """Returns the cells that are not holes and touch
+    the outside of the board: the cells out of bounds
+    and the holes connected to them."""
+    flat_holes = holes.reshape(-1)
+    outside = np.append(np.zeros_like(flat_holes), True)
+    while True:
+        touching = outside[neighbours[:-1]].any(axis=-1)
+        new_outside = np.append(flat_holes & touching, True)
+        if (new_outside == outside).all():
+            break
+        outside = new_outside
+    return (~flat_holes & touching).reshape(holes.shape)
+
+
+def _symmetries(size: int, holes: np.ndarray) -> np.ndarray:
+    """Returns which symmetries of the grid map the
+    cells of the layout onto themselves, up to a
+    translation."""
+    x, y = np.where(~holes)
+    x_, y_ = x - size // 2, y - size // 2
+    q = y_ - (x_ - (x_ & 1)) // 2
+    r, s = x_, -q - x_
+
+    def normalised(symmetry):
+        tq, tr, _ = transform_cube(q, r, s, symmetry)
+        if len(tq) == 0:
+            return set()
+        return set(zip((tq - tq.min()).tolist(), (tr - tr.min()).tolist()))
+
+    identity = normalised(0)
+    return np.array([normalised(symmetry) == identity
+        for symmetry in range(N_SYMMETRIES)])
+
+
+def _pixels(size: int) -> np.ndarray:
+    """Returns the centre of every cell when rendered,
+    as used by BoardGUI."""
+    x, y = np.meshgrid(np.arange(size), np.arange(size), indexing='ij')
+    return np.stack([np.where(y % 2 != 0, x, x + .5), y], axis=-1).astype(np.float64)
+
+
+class LayoutRegistry:
+    """Registry computing the data of each layout once.
+    Layouts can be published in shared memory, and
+    attached from other processes by handle."""
+
+    def __init__(self) -> None:
+        self._layouts = {}
+        # Layouts without holes by size, looked up without
+        # hashing a mask on hot paths
+        self._by_size = {}
+        self._shared = {}
+        self._attached = []
+
+    def __len__(self) -> int:
+        return len(self._layouts)
+
+    def get(self, size: int, holes: Union[np.ndarray, Iterator[Coordinate]] = None) -> Layout:
+        """Returns the layout with the given size and
+        holes, given as a mask or a list of cells."""
+        if holes is None or (not isinstance(holes, np.ndarray) and not holes):
+            layout = self._by_size.get(size)
+            if layout is not None:
+                return layout
+        mask = np.zeros((size, size), dtype=bool)
+        if isinstance(holes, np.ndarray):
+            mask[:] = holes
+        elif holes:
+            for x, y in holes:
+                mask[x, y] = True
+        key = layout_key(size, mask)
+        if key not in self._layouts:
+            self._add(Layout.compute(size, mask))
+        return self._layouts[key]
+
+    def _add(self, layout: Layout) -> None:
+        self._layouts[layout.key] = layout
+        if not layout.holes.any():
+            self._by_size[layout.size] = layout
+
+    def get_for_state(self, state: np.ndarray) -> Layout:
+        """Returns the layout of the given state."""
+        return self.get(state.shape[0], state[..., 0] == -1)
+
+    def share(self, layout: Layout) -> LayoutHandle:
+        """Copies the layout into shared memory, once,
+        and returns a handle to attach to it."""
+        if layout.key not in self._shared:
+            specs = _array_specs(layout.size)
+            nbytes = sum(np.dtype(dtype).itemsize * int(np.prod(shape))
+                for _, dtype, shape in specs)
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            offset = 0
+            for name, dtype, shape in specs:
+                target = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+                target[:] = getattr(layout, name)
+                offset += target.nbytes
+                del target
+            self._shared[layout.key] = shm
+        return LayoutHandle(layout.key, layout.size, self._shared[layout.key].name)
+
+    @staticmethod
+    def attach(handle: LayoutHandle) -> Layout:
+        """Returns the layout published under the handle,
+        backed by the shared memory without copying."""
+        shm = shared_memory.SharedMemory(name=handle.shm_name)
+        arrays, offset = {}, 0
+        for name, dtype, shape in _array_specs(handle.size):
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            offset += arrays[name].nbytes
+        return Layout(handle.key, handle.size, arrays, shm)
+
+    def install(self, handle: LayoutHandle) -> Layout:
+        """Attaches the layout published under the handle
+        and returns it from get from now on, unless the
+        registry already holds it. Used by worker
+        processes, which then skip computing it."""
+        if handle.key not in self._layouts:
+            layout = self.attach(handle)
+            self._add(layout)
+            self._attached.append(layout)
+        return self._layouts[handle.key]
+
+    def close(self) -> None:
+        """Releases the shared memory blocks, and forgets
+        the layouts attached from them."""
+        for layout in self._attached:
+            del self._layouts[layout.key]
+            if self._by_size.get(layout.size) is layout:
+                del self._by_size[layout.size]
+            layout.close()
+        self._attached = []
+        for shm in self._shared.values():
+            shm.close()
+            shm.unlink()
+        self._shared = {}
+
+
+REGISTRY = LayoutRegistry()
+atexit.register(REGISTRY.close)
+
+
+def get_layout(state: np.ndarray) -> Layout:
+    """Returns the layout of the state from the global
+    registry."""
+    return REGISTRY.get_for_state(state)
@@ -0,0 +1,189 @@
+"""Matches between two players, stopped as soon as a
+sequential probability ratio test (SPRT) decides
+whether the first player is stronger.
+
+Games are played in pairs with the same seed, each
+player moving first once, so that the luck of the
+placement and of the random moves cancels out. The
+statistics are computed on the mean score of each
+pair, which has a lower variance than single games."""
+
+import functools
+import math
+import multiprocessing as mp
+import random
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .game_environment import GameEnvironment
+from .grid import Coordinate
+from .player import Player
+
+
+PlayerFactory = Callable[[], Player]
+
+PlayPair = Callable[[int], Tuple[float, float]]
+
+H0, H1 = 'H0', 'H1'
+
+
+def game_result(score: int, other_score: int) -> float:
+    """Returns 1 for a win, 0.5 for a draw and 0 for a
+    loss."""
+    return 0.5 if score == other_score else float(score > other_score)
+
+
+def play_pair(player_a: PlayerFactory, player_b: PlayerFactory, seed: int,
+              size: int = 8, holes: List[Coordinate] = None,
+              n_units: int = 16) -> Tuple[float, float]:
+    """Plays two games with the same seed, player A
+    moving first in the first one and second in the
+    other. Returns the results of player A."""
+    results = []
+    for a_first in (True, False):
+        random.seed(seed)
+        np.random.seed(seed)
+        players = [player_a(), player_b()] if a_first else [player_b(), player_a()]
+        env = GameEnvironment(size, players, None, holes or [], n_units=n_units)
+        scores = env.play_game()
+        a_id, b_id = (1, 2) if a_first else (2, 1)
+        results.append(game_result(scores[a_id], scores[b_id]))
+    return tuple(results)
+
+
+def expected_score(elo: float) -> float:
+    """Returns the expected score of a player rated elo
+    points above its opponent."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_difference(score: float) -> float:
+    """Returns the Elo difference matching an expected
+    score, clamped to avoid infinities."""
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1 / score - 1)
+
+
+def _mean_variance(pair_scores: List[float]) -> Tuple[float, float]:
+    scores = np.asarray(pair_scores, dtype=np.float64)
+    # Avoid a null variance when all the pairs have the same result
+    return float(scores.mean()), max(float(scores.var()), 1e-4)
+
+
+def sprt_llr(pair_scores: List[float], elo0: float, elo1: float) -> float:
+    """Returns the log-likelihood ratio of H1 (the Elo
+    difference is elo1) against H0 (it is elo0), using
+    the normal approximation of the mean pair score."""
+    if not pair_scores:
+        return 0.0
+    mean, variance = _mean_variance(pair_scores)
+    s0, s1 = expected_score(elo0), expected_score(elo1)
+    return len(pair_scores) * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+
+def sprt_bounds(alpha: float, beta: float) -> Tuple[float, float]:
+    """Returns the bounds of the log-likelihood ratio
+    accepting H0 and H1, for the false positive rate
+    alpha and false negative rate beta."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+class MatchResult(NamedTuple):
+    """Outcome of a match, from the point of view of
+    player A. decision is H1 if A is stronger, H0 if it
+    is not, and None if max_pairs was reached first."""
+    decision: Optional[str]
+    llr: float
+    n_pairs: int
+    wins: int
+    draws: int
+    losses: int
+    elo: float
+    elo_interval: Tuple[float, float]
+
+
+class MatchScheduler:
+    """Runs pairs of games between player A and player
+    B in parallel batches, and stops as soon as the SPRT
+    of elo1 against elo0 is decided.
+
+    The players are given as picklable factories, e.g.
+    classes or functools.partial objects. A custom
+    play function taking a seed and returning the pair
+    of results of A can replace play_pair."""
+
+    def __init__(self, player_a: PlayerFactory = None, player_b: PlayerFactory = None,
+                 elo0: float = 0.0, elo1: float = 20.0, alpha: float = 0.05,
+                 beta: float = 0.05, max_pairs: int = 1000, batch_size: int = 16,
+                 n_workers: int = 1, size: int = 8, holes: List[Coordinate] = None,
+                 n_units: int = 16, seed: int = 0, play: PlayPair = None) -> None:
+        assert elo1 > elo0
+        if play is None:
+            assert player_a is not None and player_b is not None
+            play = functools.partial(play_pair, player_a, player_b, size=size,
+                                     holes=holes, n_units=n_units)
+        self.play = play
+        self.elo0, self.elo1 = elo0, elo1
+        self.bounds = sprt_bounds(alpha, beta)
+        self.max_pairs = max_pairs
+        self.batch_size = batch_size
+        self.n_workers = n_workers
+        self.seed = seed
+        self.results = []
+
+    def _batches(self) -> Iterator[List[int]]:
+        seeds = range(self.seed, self.seed + self.max_pairs)
+        for start in range(0, self.max_pairs, self.batch_size):
+            yield list(seeds[start:start + self.batch_size])
+
+    def llr(self) -> float:
+        """Returns the log-likelihood ratio so far."""
+        return sprt_llr([sum(pair) / 2 for pair in self.results], self.elo0, self.elo1)
+
+    def decision(self) -> Optional[str]:
+        """Returns the decision of the SPRT so far."""
+        llr = self.llr()
+        lower, upper = self.bounds
+        if llr <= lower:
+            return H0
+        if llr >= upper:
+            return H1
+        return None
+
+    def run(self) -> MatchResult:
+        """Plays batches of pairs until the SPRT is
+        decided or max_pairs pairs were played. Every
+        pair of a batch is counted, so the result does
+        not depend on the number of workers."""
+        pool = mp.Pool(self.n_workers) if self.n_workers > 1 else None
+        try:
+            for seeds in self._batches():
+                if pool is not None:
+                    self.results.extend(pool.map(self.play, seeds))
+                else:
+                    self.results.extend(self.play(seed) for seed in seeds)
+                if self.decision() is not None:
+                    break
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        return self.summary()
+
+    def summary(self) -> MatchResult:
+        """Returns the result of the games played so far,
+        with a 95% confidence interval of the Elo
+        difference."""
+        games = [result for pair in self.results for result in pair]
+        pair_scores = [sum(pair) / 2 for pair in self.results]
+        if pair_scores:
+            mean, variance = _mean_variance(pair_scores)
+            margin = 1.96 * math.sqrt(variance / len(pair_scores))
+        else:
+            mean, margin = 0.5, 0.5
+        return MatchResult(
+            decision=self.decision(), llr=self.llr(), n_pairs=len(self.results),
+            wins=games.count(1.0), draws=games.count(0.5), losses=games.count(0.0),
+            elo=elo_difference(mean),
+            elo_interval=(elo_difference(mean - margin), elo_difference(mean + margin)))
@@ -0,0 +1,514 @@
+"""Monte Carlo tree search running in several
+processes, with root or tree parallelism. The board
+state is shared with the workers through shared
+memory."""
+
+import math
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .arena import StateArena
+from .board import Board
+from .evalstore import EvaluationStore
+from .grid import DIRECTIONS
+from .layout import REGISTRY, LayoutHandle
+from .perft import UnitSplits, half_splits
+from .player import Player
+from .rollout import rollout
+
+
+Move = Tuple[int, int, int, int]
+
+PASS = (-1, -1, -1, 0)
+
+_DIRECTION_NAMES = list(DIRECTIONS)
+
+
+def _moves(board: Board, player_id: int, unit_splits: UnitSplits) -> List[Move]:
+    """Returns the moves of the player as tuples
+    (x, y, direction index, n_units)."""
+    return [(int(x), int(y), _DIRECTION_NAMES.index(direction), int(n_units))
+        for (x, y), direction in board.get_actions(player_id)
+        for n_units in unit_splits(board.units_at(x, y))]
+
+
+def _play(board: Board, player_id: int, move: Move) -> None:
+    x, y, direction, n_units = move
+    if move != PASS:
+        board.move_player(player_id, x, y, n_units, _DIRECTION_NAMES[direction])
+
+
+def _next_player(player_id: int, n_players: int) -> int:
+    return player_id % n_players + 1
+
+
+def _node_moves(board: Board, player_id: int, n_players: int,
+                unit_splits: UnitSplits) -> List[Move]:
+    """Returns the moves of the player at a node: its
+    own moves, a single pass if only other players can
+    move, or nothing if the game is over."""
+    moves = _moves(board, player_id, unit_splits)
+    if moves:
+        return moves
+    for other in range(1, n_players + 1):
+        if board.has_any_action(other):
+            return [PASS]
+    return []
+
+
+def playout(board: Board, to_move: int, n_players: int,
+            rng: np.random.Generator) -> np.ndarray:
+    """Plays random moves until the end of the game, in
+    place. Returns the reward of every player, indexed
+    by player id: the winners share a reward of one."""
+    rollout(board.get_state(), to_move, rng, n_players)
+    return rewards(board.get_state(), n_players)
+
+
+def rewards(state: np.ndarray, n_players: int) -> np.ndarray:
+    """Returns the reward of every player of a finished
+    game, indexed by player id."""
+    scores = np.array([0] + [(state[..., 0] == player_id).sum()
+        for player_id in range(1, n_players + 1)])
+    winners = scores[1:] == scores[1:].max()
+    result = np.zeros(n_players + 1)
+    result[1:][winners] = 1 / winners.sum()
+    return result
+
+
+class _Node:
+    """Node of a tree search within one process."""
+
+    def __init__(self, mover: int, to_move: int, moves: List[Move]) -> None:
+        self.mover = mover
+        self.to_move = to_move
+        self.untried = moves
+        self.children = {}
+        self.visits = 0
+        self.value = 0.
+
+
+def search_tree(state: np.ndarray, to_move: int, n_players: int, n_playouts: int,
+                seed: int = None, exploration: float = 1.4,
+                unit_splits: UnitSplits = half_splits) -> Dict[Move, int]:
+    """Runs a sequential search and returns the visit
+    counts of the moves at the root."""
+    return {move: visits for move, (visits, _) in _search_stats(
+        state, to_move, n_players, n_playouts, seed, exploration, unit_splits).items()}
+
+
+def _search_stats(state: np.ndarray, to_move: int, n_players: int, n_playouts: int,
+                  seed: int, exploration: float,
+                  unit_splits: UnitSplits) -> Dict[Move, Tuple[int, float]]:
+    """Runs a sequential search and returns the visit
+    count and total reward of the moves at the root."""
+    rng = np.random.default_rng(seed)
+    # Every playout starts from a copy of the root in the
+    # same scratch slot
+    arena = StateArena(state.shape[0], 2)
+    root_slot, scratch = arena.alloc(), arena.alloc()
+    arena.clone_into(root_slot, state)
+    board = arena.board(scratch)
+    root = _Node(0, to_move, _node_moves(arena.board(root_slot), to_move, n_players,
+                                         unit_splits))
+
+    for _ in range(n_playouts):
+        arena.clone_into(scratch, root_slot)
+        node, path = root, [root]
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            move, node = max(node.children.items(), key=lambda item:
+                item[1].value / item[1].visits
+                + exploration * math.sqrt(log_visits / item[1].visits))
+            _play(board, path[-1].to_move, move)
+            path.append(node)
+        if node.untried:
+            move = node.untried.pop(rng.integers(len(node.untried)))
+            _play(board, node.to_move, move)
+            next_player = _next_player(node.to_move, n_players)
+            child = _Node(node.to_move, next_player,
+                          _node_moves(board, next_player, n_players, unit_splits))
+            node.children[move] = child
+            node = child
+            path.append(node)
+        result = playout(board, node.to_move, n_players, rng)
+        for visited in path:
+            visited.visits += 1
+            visited.value += result[visited.mover]
+
+    return {move: (child.visits, child.value) for move, child in root.children.items()}
+
+
+def _attach_state(name: str, size: int) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray((size, size, 2), dtype=np.int8, buffer=shm.buf)
+
+
+def _root_worker(name: str, size: int, to_move: int, n_players: int, n_playouts: int,
+                 seed: int, exploration: float, unit_splits: UnitSplits,
+                 layout: LayoutHandle) -> Dict[Move, Tuple[int, float]]:
+    """Runs an independent search on the state stored
+    in shared memory."""
+    REGISTRY.install(layout)
+    shm, state = _attach_state(name, size)
+    try:
+        return _search_stats(state, to_move, n_players, n_playouts, seed,
+                             exploration, unit_splits)
+    finally:
+        del state
+        shm.close()
+
+
+# Layout of the shared node array used in tree parallelism
+_NODE_FIELDS = [
+    ('visits', np.float64, ()),
+    ('value', np.float64, ()),
+    ('virtual', np.float64, ()),
+    ('mover', np.int64, ()),
+    ('to_move', np.int64, ()),
+    ('first_child', np.int64, ()),
+    ('n_children', np.int64, ()),
+    ('move', np.int64, (4,)),
+]
+
+
+class SharedTree:
+    """Tree stored as arrays of nodes in shared memory.
+    Node 0 is the root; the children of a node are
+    stored contiguously. n_children is -1 until the
+    node is expanded."""
+
+    def __init__(self, capacity: int, name: str = None) -> None:
+        self.capacity = capacity
+        dtype = np.dtype([(field, dt, shape) for field, dt, shape in _NODE_FIELDS])
+        nbytes = 8 + capacity * dtype.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=nbytes)
+        self._count = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        self.nodes = np.ndarray((capacity,), dtype=dtype, buffer=self.shm.buf, offset=8)
+        if name is None:
+            self._count[0] = 0
+
+    def allocate(self, n: int) -> int:
+        """Returns the index of n new nodes, or -1 if
+        the tree is full."""
+        first = int(self._count[0])
+        if first + n > self.capacity:
+            return -1
+        self._count[0] = first + n
+        self.nodes[first:first+n] = 0
+        self.nodes['n_children'][first:first+n] = -1
+        return first
+
+    def close(self, unlink: bool = False) -> None:
+        del self._count, self.nodes
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _select(tree: SharedTree, board: Board, n_players: int, exploration: float,
+            unit_splits: UnitSplits) -> List[int]:
+    """Descends the tree from the root, adding a virtual
+    loss to the visited nodes, and expands the leaf.
+    Must be called holding the lock."""
+    nodes = tree.nodes
+    path = [0]
+    node = 0
+    while nodes['n_children'][node] > 0:
+        first, n = nodes['first_child'][node], nodes['n_children'][node]
+        children = slice(first, first + n)
+        visits = nodes['visits'][children] + nodes['virtual'][children]
+        total = nodes['visits'][node] + nodes['virtual'][node]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(
+                visits > 0,
+                nodes['value'][children] / visits
+                + exploration * np.sqrt(math.log(max(total, 1)) / visits),
+                np.inf)
+        node = first + int(np.argmax(scores))
+        _play(board, int(nodes['to_move'][path[-1]]), tuple(nodes['move'][node]))
+        nodes['virtual'][node] += 1
+        path.append(node)
+
+    if nodes['n_children'][node] == -1:
+        to_move = int(nodes['to_move'][node])
+        moves = _node_moves(board, to_move, n_players, unit_splits)
+        first = tree.allocate(len(moves)) if moves else 0
+        if first >= 0:
+            nodes['first_child'][node] = first
+            nodes['n_children'][node] = len(moves)
+            for i, move in enumerate(moves):
+                nodes['mover'][first + i] = to_move
+                nodes['to_move'][first + i] = _next_player(to_move, n_players)
+                nodes['move'][first + i] = move
+    return path
+
+
+def _tree_worker(tree_name: str, capacity: int, state_name: str, size: int,
+                 n_players: int, n_playouts: int, seed: int, exploration: float,
+                 unit_splits: UnitSplits, layout: LayoutHandle) -> None:
+    """Runs playouts on the shared tree. Selection and
+    backpropagation hold the lock of the workers,
+    playouts do not."""
+    lock = _worker_lock
+    REGISTRY.install(layout)
+    rng = np.random.default_rng(seed)
+    tree = SharedTree(capacity, tree_name)
+    shm, state = _attach_state(state_name, size)
+    nodes = tree.nodes
+    arena = StateArena(size, 1)
+    scratch = arena.alloc()
+    board = arena.board(scratch)
+    try:
+        for _ in range(n_playouts):
+            arena.clone_into(scratch, state)
+            with lock:
+                path = _select(tree, board, n_players, exploration, unit_splits)
+            result = playout(board, int(nodes['to_move'][path[-1]]), n_players, rng)
+            with lock:
+                for node in path:
+                    nodes['visits'][node] += 1
+                    nodes['value'][node] += result[nodes['mover'][node]]
+                    if node:
+                        nodes['virtual'][node] -= 1
+    finally:
+        del state, nodes
+        shm.close()
+        tree.close()
+
+
+# Lock shared by the search workers, inherited when they start
+_worker_lock = None
+
+
+def _worker_main(conn, lock) -> None:
+    """Runs the search jobs sent through the pipe
+    until None is sent or the pipe is closed, and sends
+    back their results."""
+    global _worker_lock
+    _worker_lock = lock
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        fn, args = job
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as e:
+            conn.send((False, repr(e)))
+
+
+class _SearchWorkers:
+    """Worker processes kept for the lifetime of a
+    player, with a pipe each and a shared lock."""
+
+    def __init__(self, n_workers: int) -> None:
+        assert n_workers >= 1
+        self.lock = mp.Lock()
+        self._conns, self._processes = [], []
+        for _ in range(n_workers):
+            conn, child_conn = mp.Pipe()
+            process = mp.Process(target=_worker_main, args=(child_conn, self.lock),
+                                 daemon=True)
+            process.start()
+            child_conn.close()
+            self._conns.append(conn)
+            self._processes.append(process)
+
+    def run(self, jobs: List[tuple]) -> list:
+        """Runs fn(*args) for the i-th job (fn, args) on
+        the i-th worker and returns the results. If a
+        worker fails or dies, which may leave the lock
+        held, the workers are stopped and RuntimeError is
+        raised."""
+        assert len(jobs) <= len(self._conns)
+        for conn, job in zip(self._conns, jobs):
+            conn.send(job)
+        results = [None] * len(jobs)
+        pending = dict(zip(self._conns, range(len(jobs))))
+        sentinels = {process.sentinel for process in self._processes}
+        while pending:
+            for ready in wait(list(pending) + list(sentinels)):
+                if ready in sentinels:
+                    self.close()
+                    raise RuntimeError('Search worker died.')
+                try:
+                    ok, result = ready.recv()
+                except EOFError:
+                    ok, result = False, 'connection closed'
+                if not ok:
+                    self.close()
+                    raise RuntimeError(f'Search worker failed: {result}')
+                results[pending.pop(ready)] = result
+        return results
+
+    def close(self) -> None:
+        """Stops the workers."""
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._conns, self._processes = [], []
+
+
+class MCTSPlayer(Player):
+    """Player using a parallel Monte Carlo tree search.
+
+    With mode='root', every worker grows its own tree
+    and the visit counts of the root moves are merged.
+    With mode='tree', the workers share a single tree in
+    shared memory, using virtual losses to spread out.
+    The number of players is taken from the state.
+
+    If an EvaluationStore is given, positions already
+    searched with at least n_playouts playouts are
+    answered from it, and new results are stored, with
+    the mean reward of the chosen move as value.
+
+    The worker processes are started by the first
+    search and kept until close() is called."""
+
+    def __init__(self, n_playouts: int = 1000, n_workers: int = 2,
+                 mode: str = 'root', exploration: float = 1.4,
+                 unit_splits: UnitSplits = half_splits, n_players: int = None,
+                 capacity: int = 2 ** 16, seed: int = None,
+                 store: EvaluationStore = None) -> None:
+        if mode not in ('root', 'tree'):
+            raise ValueError('Invalid mode.')
+        self.n_playouts = n_playouts
+        self.n_workers = n_workers
+        self.mode = mode
+        self.exploration = exploration
+        self.unit_splits = unit_splits
+        self.n_players = n_players
+        self.capacity = capacity
+        self.store = store
+        self._rng = np.random.default_rng(seed)
+        self._workers = None
+
+    def calculate_move(self, state, actions):
+        """Calculates the move to make."""
+        (x, y), _ = actions[0]
+        to_move = int(state[x, y, 0])
+        n_players = self.n_players or int(state[..., 0].max())
+        if self.store is not None:
+            entry = self.store.get(state, to_move)
+            if (entry is not None and entry.move is not None
+                    and entry.depth >= self.n_playouts):
+                (x, y), direction, n_units = entry.move
+                if ((x, y), direction) in actions and 1 <= n_units < state[x, y, 1]:
+                    return entry.move
+
+        stats = self.search_stats(state, to_move, n_players)
+        if not stats:
+            # No playout, or a tree too small to expand the
+            # root: play a random legal move
+            (x, y), direction = actions[self._rng.integers(len(actions))]
+            splits = list(self.unit_splits(int(state[x, y, 1])))
+            return (x, y), direction, int(splits[self._rng.integers(len(splits))])
+        best = max(stats, key=lambda move: stats[move][0])
+        x, y, direction, n_units = best
+        move = (x, y), _DIRECTION_NAMES[direction], n_units
+        if self.store is not None:
+            visits, value = stats[best]
+            self.store.put(state, to_move, value / visits, self.n_playouts, move)
+        return move
+
+    def search(self, state: np.ndarray, to_move: int, n_players: int) -> Dict[Move, int]:
+        """Returns the visit counts of the root moves."""
+        return {move: visits for move, (visits, _) in
+            self.search_stats(state, to_move, n_players).items()}
+
+    def search_stats(self, state: np.ndarray, to_move: int,
+                     n_players: int) -> Dict[Move, Tuple[int, float]]:
+        """Returns the visit count and total reward of
+        the root moves."""
+        size = state.shape[0]
+        # The workers attach the layout used by the
+        # playouts instead of computing it
+        layout = REGISTRY.share(REGISTRY.get(size))
+        shm = shared_memory.SharedMemory(create=True, size=state.nbytes)
+        try:
+            np.ndarray(state.shape, dtype=np.int8, buffer=shm.buf)[:] = state
+            if self.mode == 'root':
+                return self._root_search(shm.name, size, to_move, n_players, layout)
+            return self._tree_search(shm.name, state, to_move, n_players, layout)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self) -> None:
+        """Stops the worker processes."""
+        if self._workers is not None:
+            self._workers.close()
+            self._workers = None
+
+    def __enter__(self) -> 'MCTSPlayer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _run(self, jobs: List[tuple]) -> list:
+        """Runs the jobs on the workers, starting them
+        if needed. Failed workers are restarted by the
+        next search."""
+        if self._workers is None:
+            self._workers = _SearchWorkers(self.n_workers)
+        try:
+            return self._workers.run(jobs)
+        except RuntimeError:
+            self._workers = None
+            raise
+
+    def _split_playouts(self) -> List[int]:
+        n, k = divmod(self.n_playouts, self.n_workers)
+        return [n + (i < k) for i in range(self.n_workers)]
+
+    def _root_search(self, name: str, size: int, to_move: int, n_players: int,
+                     layout: LayoutHandle) -> Dict[Move, Tuple[int, float]]:
+        seeds = self._rng.integers(2 ** 32, size=self.n_workers)
+        jobs = [(_root_worker, (name, size, to_move, n_players, n, int(seed),
+                                self.exploration, self.unit_splits, layout))
+            for n, seed in zip(self._split_playouts(), seeds)]
+        results = self._run(jobs)
+        stats = {}
+        for result in results:
+            for move, (visits, value) in result.items():
+                total_visits, total_value = stats.get(move, (0, 0.))
+                stats[move] = total_visits + visits, total_value + value
+        return stats
+
+    def _tree_search(self, name: str, state: np.ndarray, to_move: int, n_players: int,
+                     layout: LayoutHandle) -> Dict[Move, Tuple[int, float]]:
+        tree = SharedTree(self.capacity)
+        try:
+            root = tree.allocate(1)
+            tree.nodes['to_move'][root] = to_move
+            seeds = self._rng.integers(2 ** 32, size=self.n_workers)
+            self._run([(_tree_worker, (tree.shm.name, self.capacity, name, state.shape[0],
+                                       n_players, n, int(seed), self.exploration,
+                                       self.unit_splits, layout))
+                for n, seed in zip(self._split_playouts(), seeds)])
+
+            nodes = tree.nodes
+            first, n = nodes['first_child'][0], nodes['n_children'][0]
+            return {tuple(int(v) for v in nodes['move'][i]):
+                    (int(nodes['visits'][i]), float(nodes['value'][i]))
+                for i in range(first, first + max(n, 0))}
+        finally:
+            tree.close(unlink=True)
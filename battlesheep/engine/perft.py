@@ -0,0 +1,139 @@
+"""Move path enumeration (perft), used to benchmark
+the move generator and to check faster engines
+against the reference implementation."""
+
+import multiprocessing as mp
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .board import Board
+
+
+Move = Tuple[Tuple[int, int], str, int]
+
+UnitSplits = Callable[[int], Iterator[int]]
+
+
+def all_splits(n_units: int) -> Iterator[int]:
+    """Every possible number of units to move."""
+    return range(1, n_units)
+
+
+def half_splits(n_units: int) -> Iterator[int]:
+    """Moves one, half or all but one of the units."""
+    return sorted({1, n_units // 2, n_units - 1})
+
+
+def _moves(board: Board, player_id: int, unit_splits: UnitSplits) -> List[Move]:
+    """Returns the moves of the player, including
+    the number of units moved."""
+    return [((int(x), int(y)), direction, n_units)
+        for (x, y), direction in board.get_actions(player_id)
+        for n_units in unit_splits(board.units_at(x, y))]
+
+
+def _can_anyone_move(board: Board, player_order: Sequence[int]) -> bool:
+    return any(board.has_any_action(player_id) for player_id in player_order)
+
+
+def _perft(board: Board, player_order: Sequence[int], turn: int, depth: int,
+           unit_splits: UnitSplits, cache: Optional[dict]) -> int:
+    if depth == 0:
+        return 1
+    if cache is not None:
+        key = (board.get_state().tobytes(), turn % len(player_order), depth)
+        if key in cache:
+            return cache[key]
+
+    player_id = player_order[turn % len(player_order)]
+    moves = _moves(board, player_id, unit_splits)
+    if moves:
+        count = 0
+        for (x, y), direction, n_units in moves:
+            child = board.copy()
+            child.move_player(player_id, x, y, n_units, direction)
+            count += _perft(child, player_order, turn + 1, depth - 1, unit_splits, cache)
+    elif _can_anyone_move(board, player_order):
+        # The player passes
+        count = _perft(board, player_order, turn + 1, depth - 1, unit_splits, cache)
+    else:
+        # The game is over, the position is a leaf
+        count = 1
+
+    if cache is not None:
+        cache[key] = count
+    return count
+
+
+def perft(board: Board, player_order: Sequence[int], depth: int,
+          unit_splits: UnitSplits = all_splits, use_cache: bool = False) -> int:
+    """Returns the number of leaf positions reachable in
+    depth plies, the first ply being played by
+    player_order[0]. Players without moves pass, and
+    finished games count as a single leaf."""
+    assert depth >= 0
+    cache = {} if use_cache else None
+    return _perft(board, player_order, 0, depth, unit_splits, cache)
+
+
+def _divide_worker(args) -> int:
+    board, player_order, move, depth, unit_splits, use_cache = args
+    (x, y), direction, n_units = move
+    child = board.copy()
+    child.move_player(player_order[0], x, y, n_units, direction)
+    cache = {} if use_cache else None
+    return _perft(child, player_order, 1, depth - 1, unit_splits, cache)
+
+
+def divide(board: Board, player_order: Sequence[int], depth: int,
+           unit_splits: UnitSplits = all_splits, use_cache: bool = False,
+           processes: int = None) -> Dict[Move, int]:
+    """Returns the perft count below each root move.
+    If processes is given, the root moves are split
+    across a process pool."""
+    assert depth >= 1
+    moves = _moves(board, player_order[0], unit_splits)
+    jobs = [(board, player_order, move, depth, unit_splits, use_cache) for move in moves]
+    if processes:
+        with mp.Pool(processes) as pool:
+            counts = pool.map(_divide_worker, jobs)
+    else:
+        counts = [_divide_worker(job) for job in jobs]
+    return dict(zip(moves, counts))
+
+
+def nodes_per_second(board: Board, player_order: Sequence[int], depth: int,
+                     unit_splits: UnitSplits = all_splits,
+                     processes: int = None) -> Tuple[int, float]:
+    """Runs perft and returns the number of nodes and
+    the nodes per second."""
+    start = time.perf_counter()
+    if processes:
+        nodes = sum(divide(board, player_order, depth, unit_splits,
+                           processes=processes).values())
+    else:
+        nodes = perft(board, player_order, depth, unit_splits)
+    return nodes, nodes / (time.perf_counter() - start)
+
+
+def find_divergence(board: Board, other: Board, player_order: Sequence[int],
+                    depth: int, unit_splits: UnitSplits = half_splits) -> Optional[List[Move]]:
+    """Compares the move generators of two boards in
+    the same position. Returns the shortest move path
+    leading to a position where their divide counts
+    differ, or None if they agree up to depth."""
+    for d in range(1, depth + 1):
+        ours = divide(board, player_order, d, unit_splits)
+        theirs = divide(other, player_order, d, unit_splits)
+        if set(ours) != set(theirs):
+            return []
+        for move in ours:
+            if ours[move] != theirs[move]:
+                (x, y), direction, n_units = move
+                board, other = board.copy(), other.copy()
+                board.move_player(player_order[0], x, y, n_units, direction)
+                other.move_player(player_order[0], x, y, n_units, direction)
+                order = list(player_order[1:]) + [player_order[0]]
+                path = find_divergence(board, other, order, d - 1, unit_splits)
+                return [move] + (path or [])
+    return None
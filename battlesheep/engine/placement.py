@@ -0,0 +1,103 @@
+"""Placement phase: the players place their starting
+stacks on the outer boundary of the board."""
+
+import json
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from .evaluation import ray_lengths
+from .grid import Coordinate
+from .layout import get_layout
+from .symmetry import canonical_form
+
+
+Analysis = Callable[[np.ndarray, List[Coordinate], int], Coordinate]
+
+
+def perimeter_index(state: np.ndarray) -> np.ndarray:
+    """Returns a mask of the cells on the outer boundary
+    of the board, precomputed in the layout registry.
+    The mask must not be modified."""
+    return get_layout(state).perimeter
+
+
+def legal_start_cells(state: np.ndarray) -> List[Coordinate]:
+    """Returns the empty cells of the perimeter, where a
+    starting stack can be placed."""
+    xs, ys = np.where(perimeter_index(state) & (state[..., 0] == 0))
+    return [(int(x), int(y)) for x, y in zip(xs, ys)]
+
+
+def analyse_placement(state: np.ndarray, cells: List[Coordinate],
+                      player_id: int) -> Coordinate:
+    """Chooses the start cell with the most room: the
+    largest sum of the ray lengths, breaking ties by
+    the distance to the stacks already placed."""
+    mobility = ray_lengths(state[None])[0].sum(axis=-1)
+    stacks = np.argwhere(state[..., 0] > 0)
+    best, best_score = None, None
+    for x, y in cells:
+        distance = np.abs(stacks - (x, y)).sum(axis=1).min() if len(stacks) else 0
+        score = (mobility[x, y], distance)
+        if best_score is None or score > best_score:
+            best, best_score = (x, y), score
+    return best
+
+
+class OpeningBook:
+    """Cache of placement decisions, keyed by the
+    canonical form of the position (layout and stacks
+    already placed) and the player placing. Decisions
+    are stored in the canonical frame, so they are
+    reused on rotated, reflected or translated boards."""
+
+    def __init__(self, path: str = None) -> None:
+        self.path = path
+        self._book = {}
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            try:
+                with open(path) as f:
+                    self._book = {key: tuple(cell) for key, cell in json.load(f).items()}
+            except FileNotFoundError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._book)
+
+    @staticmethod
+    def _key(form, player_id: int) -> str:
+        return f'{form.key.hex()}:{player_id}'
+
+    def lookup(self, state: np.ndarray, player_id: int) -> Optional[Coordinate]:
+        """Returns the stored placement, or None."""
+        form = canonical_form(state)
+        cell = self._book.get(self._key(form, player_id))
+        if cell is None:
+            return None
+        return form.from_canonical(*cell)
+
+    def store(self, state: np.ndarray, player_id: int, cell: Coordinate) -> None:
+        """Stores the placement of the player."""
+        form = canonical_form(state)
+        self._book[self._key(form, player_id)] = form.to_canonical(*cell)
+
+    def choose(self, state: np.ndarray, cells: List[Coordinate], player_id: int,
+               analyse: Analysis = analyse_placement) -> Coordinate:
+        """Returns the stored placement, running and
+        storing the analysis if there is none."""
+        cell = self.lookup(state, player_id)
+        if cell is not None and cell in cells:
+            self.hits += 1
+            return cell
+        self.misses += 1
+        cell = analyse(state, cells, player_id)
+        self.store(state, player_id, cell)
+        return cell
+
+    def save(self, path: str = None) -> None:
+        """Writes the book to a JSON file."""
+        with open(path or self.path, 'w') as f:
+            json.dump({key: list(cell) for key, cell in self._book.items()}, f)
@@ -2,6 +2,12 @@
 
 import random
 
+import numpy as np
+
+from .board import Actions
+from .evaluation import LinearScorer, evaluate_moves
+from .placement import OpeningBook, analyse_placement
+
 
 class Player():
     """Abstract base class for players."""
@@ -10,13 +16,57 @@ class Player():
         """Calculates the move to make."""
         raise NotImplementedError
 
+    def calculate_placement(self, state, cells):
+        """Chooses the cell where to place the starting
+        stack. Places it at random by default."""
+        return random.choice(cells)
+
 
 class RandomPlayer(Player):
     """Naive player that makes random moves."""
 
     def calculate_move(self, state, actions):
         """Calculates the move to make."""
-        (x, y), direction = random.choice(actions)
+        if isinstance(actions, Actions):
+            # Sampled without building the list of actions
+            (x, y), direction = actions.sample(random)
+        else:
+            (x, y), direction = random.choice(actions)
         max_units = state[x, y, 1]
         n_units = random.randint(1, max_units-1)
         return (x, y), direction, n_units
+
+
+class GreedyPlayer(Player):
+    """Player that makes the move with the best
+    evaluation, trying a few splits of each stack."""
+
+    def __init__(self, scorer=None, book: OpeningBook = None) -> None:
+        self.scorer = scorer if scorer is not None else LinearScorer()
+        self.book = book
+
+    def calculate_placement(self, state, cells):
+        """Places the starting stack where it has the
+        most room, using the opening book if given."""
+        player_id = int(state[..., 0].max()) + 1
+        if self.book is not None:
+            return self.book.choose(state, cells, player_id)
+        return analyse_placement(state, cells, player_id)
+
+    def calculate_move(self, state, actions):
+        """Calculates the move to make."""
+        moves = []
+        for (x, y), direction in actions:
+            max_units = state[x, y, 1]
+            for n_units in sorted({1, max_units // 2, max_units - 1}):
+                moves.append(((x, y), direction, n_units))
+        scores = evaluate_moves(
+            state, np.zeros(len(moves), dtype=int), [m[0] for m in moves],
+            [m[1] for m in moves], np.array([m[2] for m in moves]), self.scorer)
+        return moves[int(np.argmax(scores))]
+
+
+PLAYER_TYPES = {
+    'random': RandomPlayer,
+    'greedy': GreedyPlayer,
+}
@@ -0,0 +1,142 @@
+"""Publication of the state of a running game in
+shared memory, for viewers in other processes.
+
+The buffer starts with a header of four 64-bit
+integers (sequence counter, size of the board, closed
+flag, number of readers attached) followed by the
+grid. The sequence counter is a
+seqlock: it is odd while the grid is being written,
+so readers never wait on the engine and retry if the
+grid changed while they were copying it.
+
+The closed flag is 1 once the publisher is closed and
+the buffer unlinked, and 2 if the publisher handed the
+buffer over to a viewer, which unlinks it when done."""
+
+import subprocess
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+_HEADER = 4
+_SEQUENCE, _SIZE, _CLOSED, _READERS = range(_HEADER)
+
+_UNLINKED, _HANDED_OVER = 1, 2
+
+
+def _views(shm: shared_memory.SharedMemory, size: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the header and grid stored in the
+    shared memory block."""
+    header = np.ndarray((_HEADER,), dtype=np.uint64, buffer=shm.buf)
+    if size is None:
+        size = int(header[_SIZE])
+    grid = np.ndarray((size, size, 2), dtype=np.int8, buffer=shm.buf,
+                      offset=header.nbytes)
+    return header, grid
+
+
+class StatePublisher:
+    """Writer side of the shared buffer. Publishing
+    never blocks."""
+
+    def __init__(self, size: int) -> None:
+        nbytes = _HEADER * 8 + size * size * 2
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._header, self._grid = _views(self._shm, size)
+        self._header[:] = (0, size, 0, 0)
+        self.name = self._shm.name
+
+    def publish(self, state: np.ndarray) -> None:
+        """Copies the state into the buffer."""
+        self._header[_SEQUENCE] += 1
+        self._grid[:] = state
+        self._header[_SEQUENCE] += 1
+
+    @property
+    def n_readers(self) -> int:
+        """Returns the number of readers attached so far."""
+        return int(self._header[_READERS])
+
+    def close(self, timeout: float = 0.0, unlink: bool = True) -> None:
+        """Tells the readers that no more states will be
+        published and releases the buffer. Waits up to
+        timeout seconds for a first reader to attach, so
+        that a viewer started late still sees the final
+        state. Without unlink, the buffer is handed over
+        to a viewer, which must unlink it."""
+        if self._shm is None:
+            return
+        self._header[_CLOSED] = _UNLINKED if unlink else _HANDED_OVER
+        end = time.monotonic() + timeout
+        while self.n_readers == 0 and time.monotonic() < end:
+            time.sleep(0.01)
+        del self._header, self._grid
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+        else:
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self._shm = None
+
+
+class StateReader:
+    """Reader side of the shared buffer. A reader in a
+    standalone process must not be tracked, otherwise
+    the buffer is unlinked when the process exits."""
+
+    def __init__(self, name: str, track: bool = True) -> None:
+        self._shm = shared_memory.SharedMemory(name=name)
+        if not track:
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self._header, self._grid = _views(self._shm)
+        self._header[_READERS] += 1
+        self.size = self._grid.shape[0]
+
+    @property
+    def closed(self) -> bool:
+        """Returns True once the publisher is closed."""
+        return bool(self._header[_CLOSED])
+
+    @property
+    def handed_over(self) -> bool:
+        """Returns True if the publisher was closed
+        without unlinking the buffer."""
+        return int(self._header[_CLOSED]) == _HANDED_OVER
+
+    def read(self, last_sequence: int = 0) -> Optional[Tuple[int, np.ndarray]]:
+        """Returns the sequence number and a copy of the
+        latest state, or None if nothing was published
+        after last_sequence. Intermediate states are
+        skipped."""
+        while True:
+            sequence = int(self._header[_SEQUENCE])
+            if sequence == last_sequence:
+                return None
+            if sequence % 2:
+                continue
+            state = self._grid.copy()
+            if int(self._header[_SEQUENCE]) == sequence:
+                return sequence, state
+
+    def unlink(self) -> None:
+        """Unlinks the buffer handed over by the
+        publisher. It stays mapped until closed."""
+        # The publisher unregistered the block when handing
+        # it over, and SharedMemory.unlink unregisters it
+        resource_tracker.register(self._shm._name, 'shared_memory')
+        self._shm.unlink()
+
+    def close(self) -> None:
+        del self._header, self._grid
+        self._shm.close()
+
+
+def launch_viewer(name: str, fps: float = 10.0) -> subprocess.Popen:
+    """Starts a live viewer of the buffer in a separate
+    process and returns it."""
+    return subprocess.Popen([sys.executable, '-m', 'battlesheep.graphics.live_viewer',
+                             name, '--fps', str(fps)])
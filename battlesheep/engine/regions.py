@@ -0,0 +1,132 @@
+"""Analysis of the connected regions of empty cells,
+used to fast-forward games once the players can no
+longer interact."""
+
+from typing import Callable, Dict, Set, Tuple
+
+import numpy as np
+
+from .grid import neighbour_table
+from .layout import REGISTRY
+
+
+Solver = Callable[[np.ndarray, int], int]
+
+
+def label_regions(state: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Labels the connected regions of empty cells by
+    flood fill over the hexagonal neighbourhood. Returns
+    an array of labels (-1 for non-empty cells) and the
+    number of regions."""
+    size = state.shape[0]
+    n_cells = size * size
+    neighbours = REGISTRY.get(size).neighbours[:-1]
+    empty = np.append(state[..., 0].reshape(-1) == 0, False)
+
+    # Every empty cell starts with its own index as label, the
+    # rest with a label larger than any index
+    labels = np.where(empty, np.arange(n_cells + 1), n_cells)
+    while True:
+        new_labels = np.minimum(labels[:-1], labels[neighbours].min(axis=1))
+        new_labels = np.append(np.where(empty[:-1], new_labels, n_cells), n_cells)
+        # Pointer jumping: labels are indices of cells in the same region
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    labels = labels[:-1]
+    roots, labels = np.unique(labels, return_inverse=True)
+    labels = labels.reshape(size, size)
+    if roots[-1] == n_cells:
+        labels[labels == len(roots) - 1] = -1
+        return labels, len(roots) - 1
+    return labels, len(roots)
+
+
+def region_players(state: np.ndarray, labels: np.ndarray) -> Dict[int, Set[int]]:
+    """Returns, for every region, the players with a
+    moveable stack (more than one unit) touching it."""
+    size = state.shape[0]
+    table = neighbour_table(size)
+    xs, ys = np.where((state[..., 0] > 0) & (state[..., 1] > 1))
+    touching = {region: set() for region in range(labels.max() + 1)}
+    for x, y in zip(xs, ys):
+        player_id = int(state[x, y, 0])
+        for nx, ny in table[x, y]:
+            if nx >= 0 and labels[nx, ny] >= 0:
+                touching[labels[nx, ny]].add(player_id)
+    return touching
+
+
+def is_separated(state: np.ndarray) -> bool:
+    """Returns True if every region of empty cells is
+    touched by at most one player, so that the players
+    cannot interact for the rest of the game."""
+    labels, _ = label_regions(state)
+    return all(len(players) <= 1
+        for players in region_players(state, labels).values())
+
+
+def _ray_end(state: np.ndarray, table: np.ndarray, x: int, y: int,
+             direction: int) -> Tuple[int, int]:
+    """Returns the cell where a stack at (x, y) moving
+    in the given direction stops, as in
+    HexagonalGrid.get_next_moveable_cell."""
+    while True:
+        nx, ny = table[x, y, direction]
+        if nx < 0 or state[nx, ny, 0] != 0:
+            return x, y
+        x, y = nx, ny
+
+
+def greedy_solver(state: np.ndarray, player_id: int) -> int:
+    """Returns the number of cells the player claims by
+    playing alone from the given state, filling cells
+    with few empty neighbours first and halving the
+    stacks. This is a lower bound of the optimum."""
+    state = state.copy()
+    table = neighbour_table(state.shape[0])
+    claimed = 0
+    while True:
+        best = None
+        xs, ys = np.where((state[..., 0] == player_id) & (state[..., 1] > 1))
+        for x, y in zip(xs, ys):
+            for direction in range(table.shape[2]):
+                nx, ny = _ray_end(state, table, x, y, direction)
+                if (nx, ny) == (x, y):
+                    continue
+                freedom = sum(1 for mx, my in table[nx, ny]
+                    if mx >= 0 and state[mx, my, 0] == 0)
+                if best is None or freedom < best[0]:
+                    best = (freedom, x, y, nx, ny)
+        if best is None:
+            return claimed
+        _, x, y, nx, ny = best
+        n_units = state[x, y, 1] // 2
+        state[x, y, 1] -= n_units
+        state[nx, ny] = (player_id, n_units)
+        claimed += 1
+
+
+def upper_bound_solver(state: np.ndarray, player_id: int) -> int:
+    """Returns an upper bound of the number of cells the
+    player can still claim: every move claims one cell
+    of its regions and leaves one more unit behind."""
+    labels, _ = label_regions(state)
+    regions = [region for region, players in region_players(state, labels).items()
+        if player_id in players]
+    n_cells = np.isin(labels, regions).sum()
+    stacks = state[..., 1][(state[..., 0] == player_id) & (state[..., 1] > 1)]
+    return int(min(n_cells, (stacks.astype(int) - 1).sum()))
+
+
+def resolve_scores(state: np.ndarray, n_players: int,
+                   solver: Solver = greedy_solver) -> Dict[int, int]:
+    """Returns the final scores of a separated position,
+    adding the cells each player claims according to
+    the solver to its current score."""
+    assert is_separated(state)
+    return {player_id: int((state[..., 0] == player_id).sum())
+                       + solver(state, player_id)
+        for player_id in range(1, n_players+1)}
@@ -0,0 +1,160 @@
+"""Players running in pooled worker processes."""
+
+import itertools
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from .player import Player, RandomPlayer
+
+
+def _worker_main(conn, shm_name: str, max_size: int) -> None:
+    """Serves move requests until the pipe is closed.
+    The state of the board is read from shared memory,
+    only its shape travels through the pipe."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffer = np.ndarray((max_size * max_size * 2,), dtype=np.int8, buffer=shm.buf)
+    players = {}
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            player_id, player, size, actions = message
+            if player is not None:
+                players[player_id] = player
+            state = buffer[:size * size * 2].reshape(size, size, 2).copy()
+            conn.send(players[player_id].calculate_move(state, actions))
+    finally:
+        del buffer
+        shm.close()
+
+
+class _Worker:
+    """Worker process with its own shared memory
+    block and pipe."""
+
+    def __init__(self, context, max_size: int) -> None:
+        self.max_size = max_size
+        self.shm = shared_memory.SharedMemory(create=True, size=max_size * max_size * 2)
+        self.buffer = np.ndarray((max_size * max_size * 2,), dtype=np.int8,
+                                 buffer=self.shm.buf)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, self.shm.name, max_size),
+            daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.loaded = set()
+
+    def request(self, player_id: int, player: Player, state: np.ndarray,
+                actions: list, deadline: Optional[float]):
+        """Sends a move request and waits for the answer.
+        Raises TimeoutError if the deadline is exceeded
+        and EOFError if the worker died."""
+        size = state.shape[0]
+        assert size <= self.max_size
+        self.buffer[:state.size] = state.reshape(-1)
+        send_player = None if player_id in self.loaded else player
+        self.conn.send((player_id, send_player, size, actions))
+        self.loaded.add(player_id)
+        if not self.conn.poll(deadline):
+            raise TimeoutError('Worker exceeded the deadline.')
+        return self.conn.recv()
+
+    def close(self) -> None:
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        del self.buffer
+        self.shm.close()
+        self.shm.unlink()
+
+
+class WorkerPool:
+    """Pool of worker processes that can be shared
+    by several RemotePlayers and games. Dead or stuck
+    workers are replaced by fresh ones."""
+
+    def __init__(self, n_workers: int = 2, max_size: int = 32) -> None:
+        assert n_workers >= 1
+        self._context = mp.get_context()
+        self._max_size = max_size
+        self._idle = queue.Queue()
+        self._workers = []
+        self.n_restarts = 0
+        for _ in range(n_workers):
+            worker = _Worker(self._context, max_size)
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def request(self, player_id: int, player: Player, state: np.ndarray,
+                actions: list, deadline: Optional[float]):
+        """Asks an idle worker to calculate the move of
+        the given player. Blocks until a worker is free."""
+        worker = self._idle.get()
+        try:
+            move = worker.request(player_id, player, state, actions, deadline)
+        except (TimeoutError, EOFError, OSError):
+            worker = self._restart(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+        return move
+
+    def _restart(self, worker: _Worker) -> _Worker:
+        """Replaces the given worker with a new one."""
+        worker.close()
+        new_worker = _Worker(self._context, self._max_size)
+        self._workers[self._workers.index(worker)] = new_worker
+        self.n_restarts += 1
+        return new_worker
+
+    def close(self) -> None:
+        """Stops all the workers."""
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+
+    def __enter__(self) -> 'WorkerPool':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class RemotePlayer(Player):
+    """Adapter running the given player in a worker
+    of the pool. If the worker does not answer before
+    the deadline, crashes or returns an illegal move,
+    the fallback player moves instead."""
+
+    _ids = itertools.count()
+
+    def __init__(self, player: Player, pool: WorkerPool,
+                 deadline: Optional[float] = 1.0, fallback: Player = None) -> None:
+        self.player = player
+        self.pool = pool
+        self.deadline = deadline
+        self.fallback = fallback if fallback is not None else RandomPlayer()
+        self.n_fallbacks = 0
+        self._id = next(RemotePlayer._ids)
+
+    def calculate_move(self, state, actions):
+        """Calculates the move to make."""
+        try:
+            move = self.pool.request(self._id, self.player, state,
+                                     actions, self.deadline)
+            (x, y), direction, n_units = move
+            if (((x, y), direction) in actions
+                    and 1 <= n_units < state[x, y, 1]):
+                return move
+        except Exception:
+            pass
+        self.n_fallbacks += 1
+        return self.fallback.calculate_move(state, actions)
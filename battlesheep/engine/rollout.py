@@ -0,0 +1,120 @@
+"""Fast random playouts, the inner loop of the Monte
+Carlo methods."""
+
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+from .layout import REGISTRY
+
+
+_RANDOM_BLOCK = 4096
+
+
+@lru_cache(maxsize=None)
+def _neighbours(size: int) -> Tuple[Tuple[int, ...], ...]:
+    """Returns the flat neighbours of every cell, in the
+    order of DIRECTIONS. Neighbours out of bounds point
+    to the sentinel cell size * size."""
+    neighbours = REGISTRY.get(size).neighbours[:-1]
+    return tuple(tuple(cell) for cell in neighbours.tolist())
+
+
+def rollout(state: np.ndarray, to_move: int, rng: np.random.Generator,
+            n_players: int = None) -> np.ndarray:
+    """Plays uniformly random moves until the end of the
+    game, modifying the state in place, and returns the
+    final scores indexed by player id (index 0 unused).
+
+    Moves are sampled as by RandomPlayer: a uniform
+    (origin, direction) action, then a uniform number
+    of units. Players who cannot move pass."""
+    size = state.shape[0]
+    if n_players is None:
+        n_players = int(state[..., 0].max())
+    neighbours = _neighbours(size)
+    sentinel = size * size
+
+    owner = state[..., 0].reshape(-1).tolist()
+    units = state[..., 1].reshape(-1).tolist()
+    owner.append(-1)
+
+    scores = [0] * (n_players + 1)
+    stacks = [[] for _ in range(n_players + 1)]
+    for cell in range(sentinel):
+        player_id = owner[cell]
+        if player_id > 0:
+            scores[player_id] += 1
+            if units[cell] > 1:
+                stacks[player_id].append(cell)
+
+    randoms = rng.random(_RANDOM_BLOCK).tolist()
+    i_random = 0
+    passes = 0
+    while passes < n_players:
+        player_stacks = stacks[to_move]
+
+        # Count the legal (origin, direction) pairs, forgetting the
+        # stacks that can never move again
+        n_actions = 0
+        k = 0
+        while k < len(player_stacks):
+            cell = player_stacks[k]
+            n_free = 0
+            for neighbour in neighbours[cell]:
+                if owner[neighbour] == 0:
+                    n_free += 1
+            if n_free:
+                n_actions += n_free
+                k += 1
+            else:
+                player_stacks[k] = player_stacks[-1]
+                player_stacks.pop()
+
+        if n_actions == 0:
+            passes += 1
+            to_move = to_move % n_players + 1
+            continue
+        passes = 0
+
+        if i_random + 2 > _RANDOM_BLOCK:
+            randoms = rng.random(_RANDOM_BLOCK).tolist()
+            i_random = 0
+        choice = int(randoms[i_random] * n_actions)
+        split = randoms[i_random + 1]
+        i_random += 2
+
+        # Find the chosen action
+        for k, cell in enumerate(player_stacks):
+            for direction, neighbour in enumerate(neighbours[cell]):
+                if owner[neighbour] == 0:
+                    if choice == 0:
+                        break
+                    choice -= 1
+            else:
+                continue
+            break
+
+        destination = neighbour
+        while True:
+            neighbour = neighbours[destination][direction]
+            if owner[neighbour] != 0:
+                break
+            destination = neighbour
+
+        n_units = 1 + int(split * (units[cell] - 1))
+        units[cell] -= n_units
+        if units[cell] == 1:
+            player_stacks[k] = player_stacks[-1]
+            player_stacks.pop()
+        owner[destination] = to_move
+        units[destination] = n_units
+        if n_units > 1:
+            player_stacks.append(destination)
+        scores[to_move] += 1
+        to_move = to_move % n_players + 1
+
+    state[..., 0] = np.array(owner[:-1], dtype=np.int8).reshape(size, size)
+    state[..., 1] = np.array(units, dtype=np.int8).reshape(size, size)
+    return np.array(scores)
@@ -0,0 +1,390 @@
+"""Self-play over several machines sharing a
+filesystem, without a coordinator process.
+
+The queue is a directory with one subdirectory per
+state of the jobs:
+
+    - pending/: job files written by the head.
+    - claimed/: jobs being played. A worker claims a
+      job by renaming it here with its id appended,
+      and keeps touching the file as a heartbeat.
+    - done/: jobs whose results are written.
+    - results/: compressed shards of game records, one
+      per job, waiting to be merged.
+    - merged/: shards already merged into
+      games.jsonl.
+
+Every transition is an atomic rename, so that each
+job is claimed by a single worker at a time. Jobs
+whose heartbeat stops are put back in pending/ by the
+head."""
+
+import argparse
+import gzip
+import json
+import multiprocessing as mp
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .game_environment import GameEnvironment
+from .grid import Coordinate
+from .player import PLAYER_TYPES
+
+
+STATES = ('pending', 'claimed', 'done', 'results', 'merged')
+
+STOP_FILE = 'STOP'
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Writes the file under a temporary name and
+    renames it, so that readers never see it partial."""
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def init_queue(root: str) -> None:
+    """Creates the directories of the queue."""
+    for state in STATES:
+        os.makedirs(os.path.join(root, state), exist_ok=True)
+
+
+def _job_id(name: str) -> str:
+    """Returns the id of the job from a file name in
+    any of the directories."""
+    return name.split('.')[0]
+
+
+def play_job_game(job: dict, seed: int) -> dict:
+    """Plays the game of the job with the given seed and
+    returns its record."""
+    random.seed(seed)
+    np.random.seed(seed)
+    players = [PLAYER_TYPES[player_type]() for player_type in job['players']]
+    env = GameEnvironment(job['size'], players, None, [tuple(hole) for hole in job['holes']],
+                          fast_forward=job['fast_forward'], n_units=job['n_units'])
+    scores = env.play_game()
+    return {
+        'job': job['job_id'],
+        'seed': seed,
+        'players': job['players'],
+        'placements': [list(env.init_dict[player_id][:2])
+                       for player_id in range(1, len(players)+1)],
+        'scores': [int(scores[player_id]) for player_id in range(1, len(players)+1)],
+    }
+
+
+class _Heartbeat(threading.Thread):
+    """Thread touching the claim file of a job until
+    stopped. lost is set if the file disappeared, i.e.
+    the job was reclaimed."""
+
+    def __init__(self, path: str, interval: float) -> None:
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                self.lost = True
+                return
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class Worker:
+    """Worker claiming jobs from the queue and playing
+    their games in a local process pool."""
+
+    def __init__(self, root: str, worker_id: str = None, n_processes: int = 1,
+                 heartbeat: float = 5.0, poll: float = 1.0) -> None:
+        self.root = root
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        assert '.' not in self.worker_id
+        self.n_processes = n_processes
+        self.heartbeat = heartbeat
+        self.poll = poll
+        self.n_jobs = 0
+        init_queue(root)
+
+    def _path(self, state: str, name: str = '') -> str:
+        return os.path.join(self.root, state, name)
+
+    def claim(self) -> Optional[str]:
+        """Claims a pending job and returns the path of
+        its claim file, or None if there is none."""
+        for name in sorted(os.listdir(self._path('pending'))):
+            if not name.endswith('.json'):
+                continue
+            claimed = self._path('claimed', f'{_job_id(name)}.{self.worker_id}.json')
+            try:
+                os.rename(self._path('pending', name), claimed)
+            except FileNotFoundError:
+                # Claimed by another worker first
+                continue
+            os.utime(claimed)
+            return claimed
+        return None
+
+    def run_job(self, claimed: str, pool=None) -> bool:
+        """Plays the games of the claimed job and writes
+        their shard. Returns False if the job was
+        reclaimed in the meantime, and its results
+        discarded."""
+        try:
+            with open(claimed) as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            return False
+        heartbeat = _Heartbeat(claimed, self.heartbeat)
+        heartbeat.start()
+        try:
+            jobs = [(job, seed) for seed in job['seeds']]
+            if pool is not None:
+                records = pool.starmap(play_job_game, jobs)
+            else:
+                records = [play_job_game(*args) for args in jobs]
+        finally:
+            heartbeat.stop()
+        if heartbeat.lost or not os.path.exists(claimed):
+            return False
+
+        data = ''.join(json.dumps(record) + '\n' for record in records).encode()
+        _write_atomic(self._path('results', f'{job["job_id"]}.jsonl.gz'),
+                      gzip.compress(data))
+        try:
+            os.rename(claimed, self._path('done', f'{job["job_id"]}.json'))
+        except FileNotFoundError:
+            # Reclaimed since the check. The job is played
+            # again, and merge drops the duplicate records.
+            return False
+        self.n_jobs += 1
+        return True
+
+    def run(self, max_jobs: int = None, idle_timeout: float = None) -> int:
+        """Processes jobs until the STOP file exists,
+        max_jobs jobs were done, or no job was found for
+        idle_timeout seconds. Returns the number of jobs
+        done."""
+        pool = mp.Pool(self.n_processes) if self.n_processes > 1 else None
+        try:
+            idle_since = time.monotonic()
+            while max_jobs is None or self.n_jobs < max_jobs:
+                if os.path.exists(os.path.join(self.root, STOP_FILE)):
+                    break
+                claimed = self.claim()
+                if claimed is None:
+                    if idle_timeout is not None and \
+                            time.monotonic() - idle_since > idle_timeout:
+                        break
+                    time.sleep(self.poll)
+                    continue
+                self.run_job(claimed, pool)
+                idle_since = time.monotonic()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return self.n_jobs
+
+
+class SelfPlayDriver:
+    """Head of the queue: submits jobs, puts abandoned
+    jobs back in the queue and merges the shards."""
+
+    def __init__(self, root: str, heartbeat_timeout: float = 30.0) -> None:
+        self.root = root
+        self.heartbeat_timeout = heartbeat_timeout
+        self._merged = None
+        init_queue(root)
+
+    def _path(self, state: str, name: str = '') -> str:
+        return os.path.join(self.root, state, name)
+
+    @property
+    def games_path(self) -> str:
+        return os.path.join(self.root, 'games.jsonl')
+
+    def submit(self, players: List[str], n_games: int, games_per_job: int = 16,
+               size: int = 8, holes: List[Coordinate] = None, n_units: int = 16,
+               seed: int = 0, fast_forward: bool = False) -> List[str]:
+        """Writes the jobs playing n_games games with
+        seeds seed, seed + 1, ... and returns their ids.
+        Workers stopped before are allowed to run again."""
+        for player_type in players:
+            if player_type not in PLAYER_TYPES:
+                raise ValueError(f'Unknown player type: {player_type}')
+        self.resume()
+        batch = uuid.uuid4().hex[:8]
+        job_ids = []
+        for i, start in enumerate(range(seed, seed + n_games, games_per_job)):
+            job_id = f'{batch}-{i:05d}'
+            job = {
+                'job_id': job_id,
+                'players': list(players),
+                'size': size,
+                'holes': [[int(x), int(y)] for x, y in holes or []],
+                'n_units': n_units,
+                'fast_forward': fast_forward,
+                'seeds': list(range(start, min(start + games_per_job, seed + n_games))),
+            }
+            _write_atomic(self._path('pending', f'{job_id}.json'), json.dumps(job).encode())
+            job_ids.append(job_id)
+        return job_ids
+
+    def reclaim(self) -> int:
+        """Puts the claimed jobs without a recent
+        heartbeat back in pending/. Returns their
+        number."""
+        n_reclaimed = 0
+        deadline = time.time() - self.heartbeat_timeout
+        for name in os.listdir(self._path('claimed')):
+            path = self._path('claimed', name)
+            try:
+                if os.path.getmtime(path) >= deadline:
+                    continue
+                os.rename(path, self._path('pending', f'{_job_id(name)}.json'))
+            except FileNotFoundError:
+                # Finished or reclaimed meanwhile
+                continue
+            n_reclaimed += 1
+        return n_reclaimed
+
+    def _merged_games(self) -> set:
+        """Returns the (job, seed) pairs of the records in
+        games.jsonl, read once. A record partially
+        written before a crash is truncated."""
+        if self._merged is None:
+            self._merged = set()
+            if os.path.exists(self.games_path):
+                with open(self.games_path, 'rb') as f:
+                    data = f.read()
+                end = data.rfind(b'\n') + 1
+                if end != len(data):
+                    os.truncate(self.games_path, end)
+                for line in data[:end].splitlines():
+                    record = json.loads(line)
+                    self._merged.add((record['job'], record['seed']))
+        return self._merged
+
+    def merge(self) -> List[dict]:
+        """Appends the records of the new shards to
+        games.jsonl and returns them. A shard is moved to
+        merged/ once its records are written, and a shard
+        of a job already merged is dropped. Records
+        already in games.jsonl, e.g. written before a
+        crash, are not appended again."""
+        merged = self._merged_games()
+        records = []
+        with open(self.games_path, 'a') as games:
+            for name in sorted(os.listdir(self._path('results'))):
+                if not name.endswith('.jsonl.gz'):
+                    continue
+                path = self._path('results', name)
+                if os.path.exists(self._path('merged', name)):
+                    os.remove(path)
+                    continue
+                with gzip.open(path, 'rt') as f:
+                    shard = [record for record in map(json.loads, f)
+                        if (record['job'], record['seed']) not in merged]
+                games.writelines(json.dumps(record) + '\n' for record in shard)
+                games.flush()
+                os.fsync(games.fileno())
+                merged.update((record['job'], record['seed']) for record in shard)
+                os.rename(path, self._path('merged', name))
+                records.extend(shard)
+        return records
+
+    def status(self) -> Dict[str, int]:
+        """Returns the number of files in every state."""
+        return {state: sum(1 for name in os.listdir(self._path(state))
+                           if not name.endswith('.tmp'))
+            for state in STATES}
+
+    def wait(self, timeout: float = None, poll: float = 1.0) -> int:
+        """Reclaims abandoned jobs and merges the results
+        until every job is merged or the timeout
+        expires. Returns the number of records merged."""
+        start = time.monotonic()
+        n_records = 0
+        while True:
+            self.reclaim()
+            n_records += len(self.merge())
+            status = self.status()
+            if status['pending'] == status['claimed'] == status['results'] == 0:
+                return n_records
+            if timeout is not None and time.monotonic() - start > timeout:
+                return n_records
+            time.sleep(poll)
+
+    def stop(self) -> None:
+        """Tells the workers to exit once their current
+        job is done."""
+        _write_atomic(os.path.join(self.root, STOP_FILE), b'')
+
+    def resume(self) -> None:
+        """Lets workers started from now on process jobs
+        again after stop()."""
+        try:
+            os.remove(os.path.join(self.root, STOP_FILE))
+        except FileNotFoundError:
+            pass
+
+    def read_games(self) -> List[dict]:
+        """Returns every record merged so far."""
+        if not os.path.exists(self.games_path):
+            return []
+        with open(self.games_path) as f:
+            return [json.loads(line) for line in f]
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog='battlesheep.engine.selfplay',
+                                     description='Self-play through a filesystem queue.')
+    parser.add_argument('root', help='directory of the queue')
+    commands = parser.add_subparsers(dest='command', required=True)
+    submit = commands.add_parser('submit', help='write jobs and merge their results')
+    submit.add_argument('--players', type=str, default='random,random')
+    submit.add_argument('--games', type=int, default=100)
+    submit.add_argument('--games-per-job', type=int, default=16)
+    submit.add_argument('--size', type=int, default=8)
+    submit.add_argument('--units', type=int, default=16)
+    submit.add_argument('--seed', type=int, default=0)
+    submit.add_argument('--heartbeat-timeout', type=float, default=30.0)
+    worker = commands.add_parser('worker', help='play jobs from the queue')
+    worker.add_argument('--processes', type=int, default=1)
+    worker.add_argument('--idle-timeout', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'submit':
+        driver = SelfPlayDriver(args.root, args.heartbeat_timeout)
+        driver.submit(args.players.split(','), args.games, args.games_per_job,
+                      size=args.size, n_units=args.units, seed=args.seed)
+        print(f'{driver.wait()} games merged into {driver.games_path}')
+        driver.stop()
+    else:
+        n_jobs = Worker(args.root, n_processes=args.processes).run(
+            idle_timeout=args.idle_timeout)
+        print(f'{n_jobs} jobs done')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Canonical forms of board states under the
+symmetries of the hexagonal grid (rotations,
+reflections and translations)."""
+
+import hashlib
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .grid import DIRECTIONS
+
+
+N_SYMMETRIES = 12
+
+_DIRECTION_BY_VECTOR = {vector: direction for direction, vector in DIRECTIONS.items()}
+
+
+def transform_cube(q: int, r: int, s: int, symmetry: int) -> Tuple[int, int, int]:
+    """Applies one of the 12 symmetries of the hexagonal
+    grid to cube coordinates, given as integers or
+    arrays. Symmetries 6 to 11 are reflections followed
+    by a rotation."""
+    if symmetry >= 6:
+        r, s = s, r
+    for _ in range(symmetry % 6):
+        q, r, s = -r, -s, -q
+    return q, r, s
+
+
+def _to_cube(size: int, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Vectorized HexagonalGrid.to_cube."""
+    x, y = x - size // 2, y - size // 2
+    q = y - (x - (x & 1)) // 2
+    return q, x, -q - x
+
+
+class CanonicalForm:
+    """Canonical form of a state. States related by a
+    symmetry share the same key. The form also maps
+    cells and directions between the state and the
+    canonical frame."""
+
+    def __init__(self, key: bytes, size: int, symmetry: int,
+                 offset: Tuple[int, int]) -> None:
+        self.key = key
+        self.size = size
+        self.symmetry = symmetry
+        self.offset = offset
+        self._inverse = None
+
+    def to_canonical(self, x: int, y: int) -> Tuple[int, int]:
+        """Maps a cell of the state to the canonical frame."""
+        q, r, s = _to_cube(self.size, np.array(x), np.array(y))
+        q, r, _ = transform_cube(int(q), int(r), int(s), self.symmetry)
+        return q - self.offset[0], r - self.offset[1]
+
+    def from_canonical(self, q: int, r: int) -> Tuple[int, int]:
+        """Maps a cell of the canonical frame back to the
+        state."""
+        if self._inverse is None:
+            self._inverse = self._build_inverse()
+        return self._inverse[q, r]
+
+    def _build_inverse(self) -> Dict[Tuple[int, int], Tuple[int, int]]:
+        return {self.to_canonical(x, y): (x, y)
+            for x in range(self.size) for y in range(self.size)}
+
+    def direction_to_canonical(self, direction: str) -> str:
+        """Maps a direction to the canonical frame."""
+        return _DIRECTION_BY_VECTOR[transform_cube(*DIRECTIONS[direction], self.symmetry)]
+
+    def direction_from_canonical(self, direction: str) -> str:
+        """Maps a direction of the canonical frame back
+        to the state."""
+        for candidate in DIRECTIONS:
+            if self.direction_to_canonical(candidate) == direction:
+                return candidate
+        raise ValueError('Invalid direction.')
+
+
+def canonical_form(state: np.ndarray, include_stacks: bool = True) -> CanonicalForm:
+    """Returns the canonical form of the state. If
+    include_stacks is False, only the layout of the
+    board (the cells that are not holes) is used."""
+    size = state.shape[0]
+    x, y = np.where(state[..., 0] >= 0)
+    if include_stacks:
+        values = state[x, y].astype(np.int64)
+    else:
+        values = np.zeros((len(x), 2), dtype=np.int64)
+    q, r, s = _to_cube(size, x, y)
+
+    best = None
+    for symmetry in range(N_SYMMETRIES):
+        tq, tr, _ = transform_cube(q, r, s, symmetry)
+        offset = (int(tq.min()), int(tr.min())) if len(x) else (0, 0)
+        rows = np.column_stack([tq - offset[0], tr - offset[1], values])
+        rows = rows[np.lexsort(rows.T[::-1])]
+        encoded = rows.astype(np.int16).tobytes()
+        if best is None or encoded < best[0]:
+            best = (encoded, symmetry, offset)
+
+    encoded, symmetry, offset = best
+    key = hashlib.blake2b(encoded, digest_size=16).digest()
+    return CanonicalForm(key, size, symmetry, offset)
+
+
+def layout_hash(state: np.ndarray) -> bytes:
+    """Returns the canonical hash of the layout of the
+    board, ignoring the stacks."""
+    return canonical_form(state, include_stacks=False).key
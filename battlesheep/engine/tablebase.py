@@ -0,0 +1,336 @@
+"""Tablebases of small two-player layouts, solved by
+retrograde analysis.
+
+Every position reachable from any placement of the
+starting stacks is enumerated level by level, the
+level being the number of occupied cells: each move
+occupies exactly one more cell, and a pass keeps the
+level but hands the turn over. Values are then
+propagated from the last level back to the first.
+
+The value of a position is the final difference of
+cells between the player to move and its opponent
+under perfect play. The table is indexed by a perfect
+hash of the positions (hash and displace), and stored
+in memory-mapped files so that a probe costs one hash
+and one lookup."""
+
+import hashlib
+import json
+import os
+import random
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .grid import Coordinate, DIRECTIONS, HexagonalGrid
+from .layout import REGISTRY
+from .player import Player
+
+
+N_PLAYERS = 2
+
+BUCKET_SIZE = 4
+
+LOAD_FACTOR = 0.9
+
+ENTRY_DTYPE = np.dtype([
+    ('fingerprint', '<u4'), ('value', 'i1'), ('direction', 'i1'),
+    ('origin', '<u2'), ('n_units', 'i1'),
+])
+
+_DIRECTION_NAMES = list(DIRECTIONS)
+
+
+class Entry(NamedTuple):
+    """Result of a probe: the value of the position for
+    the player to move, and its best move, if any."""
+    value: int
+    move: Optional[Tuple[Coordinate, str, int]]
+
+
+def tile_layout(cells: Iterable[Tuple[int, int, int]]) -> Tuple[int, List[Coordinate]]:
+    """Returns the smallest board size and the holes
+    reproducing a layout given by the cube coordinates
+    of its cells, such as the space_occupied of a
+    tiling.HexagonalTile."""
+    cells = [tuple(cell) for cell in cells]
+    extent = max(max(abs(c) for c in cell) for cell in cells)
+    for size in range(1, 4 * extent + 3):
+        grid = HexagonalGrid(size)
+        for dr in range(-size, size + 1):
+            for dq in range(-size, size + 1):
+                offsets = [grid.to_offset(q + dq, r + dr, s - dq - dr) for q, r, s in cells]
+                if all(not grid._out_of_bounds(x, y) for x, y in offsets):
+                    occupied = set(offsets)
+                    return size, [(x, y) for x in range(size) for y in range(size)
+                                  if (x, y) not in occupied]
+    raise ValueError('Layout too large.')
+
+
+class _Layout:
+    """Compact indexing of the cells of a layout."""
+
+    def __init__(self, size: int, holes: List[Coordinate]) -> None:
+        layout = REGISTRY.get(size, holes)
+        self.size = size
+        self.holes = layout.holes
+        self.cells = np.flatnonzero(~layout.holes.reshape(-1))
+        compact = np.full(size * size + 1, -1)
+        compact[self.cells] = np.arange(len(self.cells))
+        self.neighbours = compact[layout.neighbours[self.cells]].tolist()
+        self.perimeter = compact[np.flatnonzero(layout.perimeter.reshape(-1))].tolist()
+
+    def encode(self, state: np.ndarray) -> Tuple[List[int], List[int]]:
+        flat = state.reshape(-1, 2)[self.cells]
+        return flat[:, 0].tolist(), flat[:, 1].tolist()
+
+
+def _key(to_move: int, owners, units) -> bytes:
+    return bytes([to_move]) + bytes(owners) + bytes(units)
+
+
+def _decode(key: bytes, n_cells: int) -> Tuple[int, List[int], List[int]]:
+    return key[0], list(key[1:n_cells + 1]), list(key[n_cells + 1:])
+
+
+def _moves(layout: _Layout, owners: List[int], units: List[int], player_id: int):
+    """Yields the moves of the player as (origin,
+    direction, destination, n_units) in compact
+    indices."""
+    neighbours = layout.neighbours
+    for cell, owner in enumerate(owners):
+        if owner != player_id or units[cell] < 2:
+            continue
+        for direction in range(len(_DIRECTION_NAMES)):
+            destination = cell
+            while True:
+                nxt = neighbours[destination][direction]
+                if nxt < 0 or owners[nxt] != 0:
+                    break
+                destination = nxt
+            if destination != cell:
+                for n_units in range(1, units[cell]):
+                    yield cell, direction, destination, n_units
+
+
+def _child(owners: List[int], units: List[int], move, player_id: int) -> Tuple[list, list]:
+    origin, _, destination, n_units = move
+    owners, units = owners.copy(), units.copy()
+    units[origin] -= n_units
+    owners[destination], units[destination] = player_id, n_units
+    return owners, units
+
+
+def _other(player_id: int) -> int:
+    return player_id % N_PLAYERS + 1
+
+
+def _hashes(key: bytes) -> Tuple[int, int, int, int]:
+    """Returns the bucket hash, the two slot hashes and
+    the fingerprint of a key."""
+    digest = hashlib.blake2b(key, digest_size=28).digest()
+    return (int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:16], 'little'),
+            int.from_bytes(digest[16:24], 'little'), int.from_bytes(digest[24:], 'little'))
+
+
+def _next_prime(n: int) -> int:
+    n = max(n, 2)
+    while any(n % d == 0 for d in range(2, int(n ** 0.5) + 1)):
+        n += 1
+    return n
+
+
+def _slot(h1: int, h2: int, d0: int, d1: int, n_slots: int) -> int:
+    return (h1 + d0 * h2 + d1) % n_slots
+
+
+def perfect_hash(keys: List[bytes]) -> Tuple[np.ndarray, int, List[int]]:
+    """Builds a perfect hash of the keys by hash and
+    displace: keys are spread into buckets, and every
+    bucket, largest first, gets the first displacement
+    (d0, d1) for which the slots _slot(h1, h2, d0, d1)
+    of its keys are all free. Displacements are stored
+    as d0 * n_slots + d1. Returns the displacements, the
+    number of slots and the slot of every key."""
+    n_slots = _next_prime(int(len(keys) / LOAD_FACTOR) + 1)
+    n_buckets = max(1, len(keys) // BUCKET_SIZE)
+    hashes = [_hashes(key) for key in keys]
+    buckets = [[] for _ in range(n_buckets)]
+    for i, (h0, _, _, _) in enumerate(hashes):
+        buckets[h0 % n_buckets].append(i)
+
+    displacements = np.zeros(n_buckets, dtype=np.uint64)
+    taken = np.zeros(n_slots, dtype=bool)
+    slots = [0] * len(keys)
+    for bucket in sorted(range(n_buckets), key=lambda b: -len(buckets[b])):
+        if not buckets[bucket]:
+            break
+        for d in range(n_slots * n_slots):
+            d0, d1 = divmod(d, n_slots)
+            candidate = [_slot(hashes[i][1], hashes[i][2], d0, d1, n_slots)
+                for i in buckets[bucket]]
+            if len(set(candidate)) == len(candidate) and not taken[candidate].any():
+                break
+        else:
+            raise ValueError('No displacement found.')
+        taken[candidate] = True
+        displacements[bucket] = d
+        for i, slot in zip(buckets[bucket], candidate):
+            slots[i] = slot
+    return displacements, n_slots, slots
+
+
+def solve(size: int, holes: List[Coordinate], n_units: int = 4) -> Dict[bytes, tuple]:
+    """Returns the value and best move of every position
+    reachable from a placement of the two starting
+    stacks of n_units units, by retrograde analysis.
+    Moves are (origin, direction, n_units) in compact
+    indices, or None."""
+    layout = _Layout(size, holes)
+    n_cells = len(layout.cells)
+    empty = [0] * n_cells
+
+    # Forward enumeration, level by level
+    levels = [set()]
+    for first in layout.perimeter:
+        for second in layout.perimeter:
+            if first != second:
+                owners, units = empty.copy(), empty.copy()
+                owners[first], owners[second] = 1, 2
+                units[first] = units[second] = n_units
+                levels[0].add(_key(1, owners, units))
+    while levels[-1]:
+        current, following = levels[-1], set()
+        pending = list(current)
+        while pending:
+            key = pending.pop()
+            to_move, owners, units = _decode(key, n_cells)
+            moves = list(_moves(layout, owners, units, to_move))
+            for move in moves:
+                following.add(_key(_other(to_move), *_child(owners, units, move, to_move)))
+            if not moves:
+                passed = _key(_other(to_move), owners, units)
+                if passed not in current:
+                    current.add(passed)
+                    pending.append(passed)
+        levels.append(following)
+
+    # Retrograde analysis: children are on the next level, and
+    # passing positions depend on the same board for the opponent
+    table = {}
+    for level in reversed(levels):
+        passing = []
+        for key in level:
+            to_move, owners, units = _decode(key, n_cells)
+            best = None
+            for move in _moves(layout, owners, units, to_move):
+                child = _key(_other(to_move), *_child(owners, units, move, to_move))
+                value = -table[child][0]
+                if best is None or value > best[0]:
+                    best = (value, (move[0], move[1], move[3]))
+            if best is not None:
+                table[key] = best
+            else:
+                passing.append((key, to_move, owners, units))
+        for key, to_move, owners, units in passing:
+            other = _key(_other(to_move), owners, units)
+            if other in table:
+                table[key] = (-table[other][0], None)
+            else:
+                # Nobody can move: the game is over
+                score = owners.count(to_move) - owners.count(_other(to_move))
+                table[key] = (score, None)
+    return table
+
+
+def build_tablebase(path: str, size: int, holes: List[Coordinate],
+                    n_units: int = 4) -> 'Tablebase':
+    """Solves the layout and writes its tablebase in the
+    directory, then opens it."""
+    os.makedirs(path, exist_ok=True)
+    layout = _Layout(size, holes)
+    table = solve(size, holes, n_units)
+    keys = list(table)
+    displacements, n_slots, slots = perfect_hash(keys)
+
+    entries = np.zeros(n_slots, dtype=ENTRY_DTYPE)
+    for key, slot in zip(keys, slots):
+        value, move = table[key]
+        entry = entries[slot]
+        entry['fingerprint'] = _hashes(key)[3]
+        entry['value'] = value
+        if move is not None:
+            origin, direction, n_moved = move
+            entry['origin'] = layout.cells[origin]
+            entry['direction'] = direction
+            entry['n_units'] = n_moved
+
+    displacements.tofile(os.path.join(path, 'displacements.bin'))
+    entries.tofile(os.path.join(path, 'entries.bin'))
+    meta = {'size': size, 'holes': [[int(x), int(y)] for x, y in holes],
+            'n_units': n_units, 'n_positions': len(keys)}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return Tablebase(path)
+
+
+class Tablebase:
+    """Read-only tablebase of a layout, memory-mapped
+    from the directory written by build_tablebase."""
+
+    def __init__(self, path: str) -> None:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.size = meta['size']
+        self.n_units = meta['n_units']
+        self.n_positions = meta['n_positions']
+        self._layout = _Layout(self.size, [tuple(hole) for hole in meta['holes']])
+        self._displacements = np.memmap(os.path.join(path, 'displacements.bin'),
+                                        dtype=np.uint64, mode='r')
+        self._entries = np.memmap(os.path.join(path, 'entries.bin'),
+                                  dtype=ENTRY_DTYPE, mode='r')
+
+    def __len__(self) -> int:
+        return self.n_positions
+
+    def probe(self, state: np.ndarray, to_move: int) -> Optional[Entry]:
+        """Returns the value of the position and its best
+        move, or None if the position is not in the
+        table."""
+        if state.shape[0] != self.size or \
+                not np.array_equal(state[..., 0] == -1, self._layout.holes):
+            return None
+        owners, units = self._layout.encode(state)
+        key = _key(to_move, owners, units)
+        h0, h1, h2, fingerprint = _hashes(key)
+        n_slots = len(self._entries)
+        d0, d1 = divmod(int(self._displacements[h0 % len(self._displacements)]), n_slots)
+        entry = self._entries[_slot(h1, h2, d0, d1, n_slots)]
+        if entry['fingerprint'] != fingerprint:
+            return None
+        move = None
+        if entry['n_units'] > 0:
+            x, y = divmod(int(entry['origin']), self.size)
+            move = ((x, y), _DIRECTION_NAMES[entry['direction']], int(entry['n_units']))
+        return Entry(int(entry['value']), move)
+
+    def close(self) -> None:
+        self._displacements = self._entries = None
+
+
+class TablebasePlayer(Player):
+    """Player making the best moves of a tablebase, and
+    random moves in positions it does not cover."""
+
+    def __init__(self, tablebase: Tablebase) -> None:
+        self.tablebase = tablebase
+
+    def calculate_move(self, state, actions):
+        """Calculates the move to make."""
+        (x, y), _ = actions[0]
+        entry = self.tablebase.probe(state, int(state[x, y, 0]))
+        if entry is not None and entry.move is not None:
+            return entry.move
+        (x, y), direction = random.choice(actions)
+        return (x, y), direction, random.randint(1, state[x, y, 1] - 1)
@@ -0,0 +1,62 @@
+"""Tests for the StateArena class."""
+
+import numpy as np
+import pytest
+
+from battlesheep.engine.arena import StateArena
+from battlesheep.engine.board import Board
+
+
+def test_slots():
+    arena = StateArena(8, capacity=2)
+    first, second = arena.alloc(), arena.alloc()
+    assert first != second and arena.n_free() == 0
+    with pytest.raises(MemoryError):
+        arena.alloc()
+    arena.free(first)
+    assert arena.alloc() == first
+
+
+def test_double_free():
+    arena = StateArena(8, capacity=2)
+    slot = arena.alloc()
+    arena.free(slot)
+    with pytest.raises(ValueError):
+        arena.free(slot)
+    # The slot is handed out once only
+    assert arena.n_free() == 2
+    assert arena.alloc() != arena.alloc()
+    with pytest.raises(ValueError):
+        StateArena(8, capacity=2).free(0)
+
+
+def test_boards_are_views():
+    arena = StateArena(8, capacity=4)
+    board = Board(8, holes=[(1, 1)])
+    board.initialize_player(1, 0, 0, 16)
+
+    slot = arena.alloc()
+    arena.clone_into(slot, board)
+    view = arena.board(slot)
+    view.move_player(1, 0, 0, 4, 'R')
+    assert arena.state(slot)[0, 0, 1] == 12
+    assert board.units_at(0, 0) == 16
+
+    other = arena.alloc()
+    arena.clone_into(other, slot)
+    assert (arena.state(other) == arena.state(slot)).all()
+
+
+def test_history():
+    arena = StateArena(4, capacity=1, history=3)
+    slot = arena.alloc()
+    for i in range(5):
+        arena.state(slot)[0, 0] = (1, i + 2)
+        arena.push_history(slot)
+    assert arena.history_length() == 3
+    assert arena.rewind(1)[0, 0, 1] == 6
+    assert arena.rewind(3)[0, 0, 1] == 4
+    with pytest.raises(AssertionError):
+        arena.rewind(4)
+    arena.rewind(2, slot)
+    assert arena.state(slot)[0, 0, 1] == 5
@@ -1,8 +1,14 @@
 """Tests for Board class."""
 
+import pickle
+import random
+from collections import Counter
+
 import numpy as np
 
-from board import Board
+from battlesheep.engine.board import Actions, Board
+from battlesheep.engine.grid import DIRECTIONS
+from battlesheep.engine.perft import find_divergence, half_splits, perft
 
 
 def test_init():
@@ -54,3 +60,77 @@ def test_actions():
         ((7, 0), 'UR'),
         ((7, 0), 'UL')
     }
+
+
+def test_action_counting_and_sampling():
+    board = Board(8, holes=[(1, 1), (2, 2), (0, 7)])
+    board.initialize_player(1, 0, 0, 16)
+    board.initialize_player(2, 7, 7, 16)
+    board.move_player(1, 0, 0, 2, 'R')
+
+    actions = board.get_actions(1)
+    assert list(board.iter_actions(1)) == actions
+    assert board.count_actions(1) == len(actions) == 5
+    assert board.has_any_action(1)
+
+    rng = random.Random(0)
+    counts = Counter(board.sample_action(1, rng) for _ in range(5000))
+    assert set(counts) == set(actions)
+    assert all(800 < count < 1200 for count in counts.values())
+
+    lazy = Actions(board, 1)
+    assert len(lazy) == 5 and lazy
+    assert lazy.sample(rng) in actions
+    assert pickle.loads(pickle.dumps(lazy)) == actions
+
+
+def test_no_action():
+    board = Board(2)
+    board.initialize_player(1, 0, 0, 2)
+    board.move_player(1, 0, 0, 1, 'R')
+    assert board.count_actions(1) == 0
+    assert not board.has_any_action(1)
+    assert board.sample_action(1) is None
+    assert not Actions(board, 1)
+
+
+class ReferenceBoard(Board):
+    """Board generating its actions by walking rays
+    with HexagonalGrid.get_next_moveable_cell."""
+
+    def get_actions(self, player_id):
+        actions = []
+        for x, y in self._grid.get_player_moveable_positions(player_id):
+            for direction in DIRECTIONS:
+                if self._grid.get_next_moveable_cell(x, y, direction) != (x, y):
+                    actions.append(((int(x), int(y)), direction))
+        return actions
+
+    def has_any_action(self, player_id):
+        return bool(self.get_actions(player_id))
+
+    def copy(self):
+        board = ReferenceBoard.__new__(ReferenceBoard)
+        board._grid = self._grid.copy()
+        return board
+
+
+def test_matches_reference_generator():
+    random.seed(0)
+    for holes in ([], [(1, 1), (2, 2), (0, 7), (4, 3), (5, 5)]):
+        board = Board(8, holes=holes)
+        board.initialize_player(1, 0, 0, 16)
+        board.initialize_player(2, 7, 6, 16)
+        for n_moves in range(12):
+            reference = ReferenceBoard.__new__(ReferenceBoard)
+            reference._grid = board._grid.copy()
+            assert find_divergence(board, reference, [1, 2], 2, half_splits) is None
+            assert perft(board, [1, 2], 2) == perft(reference, [1, 2], 2)
+            # Compare again further into the game
+            player_id = n_moves % 2 + 1
+            actions = board.get_actions(player_id)
+            if not actions:
+                continue
+            (x, y), direction = random.choice(actions)
+            board.move_player(player_id, x, y, random.randint(1, board.units_at(x, y) - 1),
+                              direction)
@@ -0,0 +1,84 @@
+"""Tests for the exact endgame solver."""
+
+import numpy as np
+import pytest
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.endgame import (solve_region, exact_solver,
+    region_signature, cache_info, clear_cache)
+from battlesheep.engine.grid import neighbour_table
+
+
+def brute_force(board, player_id):
+    best = 0
+    for (x, y), direction in board.get_actions(player_id):
+        for n_units in range(1, board.units_at(x, y)):
+            child = Board(board.get_size())
+            child.get_state()[:] = board.get_state()
+            child.move_player(player_id, x, y, n_units, direction)
+            best = max(best, 1 + brute_force(child, player_id))
+    return best
+
+
+def test_against_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        holes = [(x, y) for x in range(4) for y in range(4) if rng.random() < 0.4]
+        board = Board(4, holes)
+        empty = [(x, y) for x in range(4) for y in range(4) if board.is_empty(x, y)]
+        if not empty:
+            continue
+        x, y = empty[0]
+        board.initialize_player(1, x, y, int(rng.integers(2, 5)))
+        assert solve_region(board.get_state(), 1) == brute_force(board, 1)
+
+
+def grown_region(seed, n_cells, n_units, size=12):
+    """Returns a board with a random connected region of
+    n_cells empty cells and a stack of n_units units."""
+    rng = np.random.default_rng(seed)
+    table = neighbour_table(size)
+    cells = {(size // 2, size // 2)}
+    while len(cells) < n_cells + 1:
+        x, y = sorted(cells)[rng.integers(len(cells))]
+        nx, ny = table[x, y, rng.integers(6)]
+        if nx >= 0:
+            cells.add((int(nx), int(ny)))
+    board = Board(size, [(x, y) for x in range(size) for y in range(size)
+                         if (x, y) not in cells])
+    board.initialize_player(1, *sorted(cells)[rng.integers(len(cells))], n_units)
+    return board
+
+
+def test_worst_case_regions():
+    # Regions where the plain exhaustive search took minutes.
+    # The pruned search visits a few dozen positions.
+    for seed in (0, 2, 7, 10, 11):
+        board = grown_region(seed, 17, 16)
+        clear_cache()
+        assert solve_region(board.get_state(), 1) == 15
+        assert cache_info().misses < 1000
+
+
+def test_translation_invariance():
+    holes = [(x, y) for x in range(8) for y in range(8) if x not in (2, 3)]
+    board = Board(8, holes)
+    board.initialize_player(1, 2, 0, 4)
+    shifted = Board(8, [(x + 2, y) for x, y in holes if x + 2 < 8]
+                       + [(x, y) for x in range(4) for y in range(8)])
+    shifted.initialize_player(1, 4, 0, 4)
+    assert region_signature(board.get_state(), 1) == \
+        region_signature(shifted.get_state(), 1)
+
+    solve_region(board.get_state(), 1)
+    hits = cache_info().hits
+    solve_region(shifted.get_state(), 1)
+    assert cache_info().hits == hits + 1
+
+
+def test_large_region_fallback():
+    board = Board(8)
+    board.initialize_player(1, 0, 0, 16)
+    with pytest.raises(ValueError):
+        solve_region(board.get_state(), 1)
+    assert 1 <= exact_solver(board.get_state(), 1) <= 15
@@ -0,0 +1,74 @@
+"""Tests for the persistent evaluation store."""
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.evalstore import EvaluationStore
+from battlesheep.engine.mcts import MCTSPlayer
+
+
+def make_board():
+    board = Board(6, holes=[(1, 1), (2, 2), (3, 1)])
+    board.initialize_player(1, 0, 0, 8)
+    board.initialize_player(2, 5, 5, 8)
+    return board
+
+
+def test_put_get(tmp_path):
+    board = make_board()
+    state = board.get_state()
+    move = board.get_actions(1)[0] + (3,)
+    with EvaluationStore(str(tmp_path)) as store:
+        assert store.get(state, 1) is None
+        store.put(state, 1, 0.75, 10, move)
+        entry = store.get(state, 1)
+        assert entry.value == 0.75 and entry.depth == 10 and entry.move == move
+        assert store.get(state, 2) is None
+
+        # Shallower evaluations do not replace deeper ones
+        store.put(state, 1, 0.1, 5)
+        assert store.get(state, 1).value == 0.75
+
+    # The log is replayed when reopening, and survives compaction
+    with EvaluationStore(str(tmp_path), cache_size=1) as store:
+        assert store.get(state, 1).move == move
+        store.put(state, 2, -1.0, 3)
+        store.compact()
+        assert len(store) == 2
+        store.put(state, 2, 0.5, 4)
+        assert store.get(state, 2).value == 0.5
+        store.compact()
+        assert len(store) == 2
+        assert store.get(state, 1).value == 0.75
+        assert store.get(state, 2).depth == 4
+
+
+def test_partial_log_record(tmp_path):
+    board = make_board()
+    with EvaluationStore(str(tmp_path)) as store:
+        store.put(board.get_state(), 1, 0.5, 1)
+    with open(tmp_path / 'log.bin', 'ab') as f:
+        f.write(b'\x01\x02\x03')
+    with EvaluationStore(str(tmp_path)) as store:
+        assert store.get(board.get_state(), 1).value == 0.5
+        # Records written after the torn one are readable
+        store.put(board.get_state(), 2, 0.25, 1)
+    with EvaluationStore(str(tmp_path)) as store:
+        assert store.get(board.get_state(), 1).value == 0.5
+        assert store.get(board.get_state(), 2).value == 0.25
+        assert len(store) == 2
+
+
+def test_mcts_warm_start(tmp_path):
+    board = make_board()
+    state, actions = board.get_state(), board.get_actions(1)
+    with EvaluationStore(str(tmp_path)) as store:
+        player = MCTSPlayer(n_playouts=50, n_workers=1, store=store)
+        move = player.calculate_move(state, actions)
+        entry = store.get(state, 1)
+        assert entry.move == move
+        assert 0 <= entry.value <= 1
+
+        # A position stored with a fake move is answered without search
+        (x, y), direction = actions[-1]
+        store.put(state, 1, 1.0, 100, ((x, y), direction, 1))
+        assert player.calculate_move(state, actions) == ((x, y), direction, 1)
+        player.close()
@@ -0,0 +1,65 @@
+"""Tests for the batch evaluation of moves."""
+
+import numpy as np
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.evaluation import (ray_lengths, apply_moves,
+    compute_features, evaluate_moves, LinearScorer)
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.player import GreedyPlayer, RandomPlayer
+
+
+def make_board():
+    board = Board(8, holes=[(1, 1), (2, 2), (0, 7)])
+    board.initialize_player(1, 0, 0, 16)
+    board.initialize_player(2, 7, 7, 16)
+    return board
+
+
+def test_ray_lengths():
+    board = make_board()
+    lengths = ray_lengths(board.get_state()[None])[0]
+    for x in range(8):
+        for y in range(8):
+            for i, direction in enumerate(['UL', 'UR', 'L', 'R', 'DL', 'DR']):
+                if board.is_hole(x, y):
+                    continue
+                nx, ny = board._grid.get_next_moveable_cell(x, y, direction)
+                assert (lengths[x, y, i] > 0) == ((nx, ny) != (x, y))
+
+
+def test_children_match_board():
+    board = make_board()
+    actions = board.get_actions(1) + board.get_actions(2)
+    states = board.get_state()[None]
+    origins = [origin for origin, _ in actions]
+    directions = [direction for _, direction in actions]
+    n_units = np.arange(1, len(actions) + 1)
+    children = apply_moves(states, np.zeros(len(actions), dtype=int),
+                           origins, directions, n_units)
+    for child, ((x, y), direction), n in zip(children, actions, n_units):
+        reference = make_board()
+        reference.move_player(reference.player_at(x, y), x, y, n, direction)
+        assert (child == reference.get_state()).all()
+
+
+def test_features():
+    board = make_board()
+    features = compute_features(board.get_state()[None], [1])[0]
+    mobility, cells, territory, frontier = features
+    assert cells == 1
+    assert territory == 61 - 2
+    assert frontier == 0
+    assert mobility == ray_lengths(board.get_state()[None])[0, 0, 0].sum()
+
+    scores = evaluate_moves(board.get_state(), [0, 0], [(0, 0), (0, 0)],
+                            ['R', 'DR'], [1, 8], LinearScorer())
+    assert scores.shape == (2,)
+
+
+def test_greedy_player():
+    env = GameEnvironment(8, [GreedyPlayer(), RandomPlayer()],
+                          {1: (0, 0, 16), 2: (7, 7, 16)},
+                          holes=[(1, 1), (2, 2), (0, 7)])
+    scores = env.play_game()
+    assert scores[1] > 1
@@ -0,0 +1,42 @@
+"""Tests for the turn rules of GameEnvironment."""
+
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.player import Player, RandomPlayer
+
+
+class CountingPlayer(RandomPlayer):
+    """Random player counting its turns, which must
+    never be asked to move without actions."""
+
+    def __init__(self):
+        self.n_moves = 0
+
+    def calculate_move(self, state, actions):
+        assert len(actions) > 0
+        self.n_moves += 1
+        return super().calculate_move(state, actions)
+
+
+class NeverMoves(Player):
+
+    def calculate_move(self, state, actions):
+        raise AssertionError('Asked to move without actions.')
+
+
+def test_blocked_player_passes():
+    # Player 1 has a single unit and can never move
+    blocked, mover = NeverMoves(), CountingPlayer()
+    env = GameEnvironment(6, [blocked, mover], {1: (0, 0, 1), 2: (5, 5, 8)}, holes=[])
+    env.play_turn()
+    assert mover.n_moves == 1
+    assert not env._finished()
+
+
+def test_game_ends_when_nobody_can_move():
+    # The game goes on while player 2 can still move
+    blocked, mover = NeverMoves(), CountingPlayer()
+    env = GameEnvironment(6, [blocked, mover], {1: (0, 0, 1), 2: (5, 5, 8)}, holes=[])
+    scores = env.play_game()
+    assert env._finished()
+    # Every move of player 2 occupies a new cell
+    assert scores[1] == 1 and scores[2] == mover.n_moves + 1 > 2
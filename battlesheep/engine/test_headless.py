@@ -0,0 +1,33 @@
+"""Tests for the headless import path and runner."""
+
+import os
+import subprocess
+import sys
+
+from battlesheep.__main__ import main
+
+IMPORT_BUDGET = 0.5
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_import_budget():
+    code = ('import sys, time\n'
+            't = time.perf_counter()\n'
+            'import battlesheep.engine.game_environment\n'
+            'print(time.perf_counter() - t, "matplotlib" in sys.modules)\n')
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    elapsed, graphics = output.split()
+    assert graphics == 'False'
+    assert float(elapsed) < IMPORT_BUDGET
+
+
+def test_cli(tmp_path, capsys):
+    holes = tmp_path / 'holes.txt'
+    holes.write_text('# holes\n1 1\n2 2\n')
+    main(['--games', '3', '--size', '6', '--holes', str(holes),
+          '--players', 'random,greedy', '--seed', '0'])
+    output = capsys.readouterr().out
+    assert '3 games in' in output
+    assert 'player 2 (greedy)' in output
@@ -0,0 +1,98 @@
+"""Tests for the batched inference broker."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.inference import (InferenceBroker, NumpyMLP,
+    NetworkPlayer, encode_observation)
+from battlesheep.engine.player import RandomPlayer
+
+
+def test_encode_observation():
+    board = Board(8, holes=[(1, 1)])
+    board.initialize_player(1, 0, 0, 16)
+    board.initialize_player(2, 7, 7, 8)
+    observation = encode_observation(board.get_state(), 2)
+    assert observation.shape == (8, 8, 4)
+    assert observation[7, 7, 0] == 0.5 and observation[0, 0, 1] == 1
+    assert observation[..., 2].sum() == 61 and observation[1, 1, 3] == 1
+
+
+def test_batching():
+    model = NumpyMLP(8, seed=0)
+    rng = np.random.default_rng(0)
+    observations = rng.random((64, 8, 8, 4)).astype(np.float32)
+    futures = [None] * len(observations)
+
+    with InferenceBroker(model, max_batch_size=16, max_latency=0.05) as broker:
+        def submit(indices):
+            for i in indices:
+                futures[i] = broker.submit(observations[i])
+        threads = [threading.Thread(target=submit, args=(range(k, 64, 4),))
+            for k in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results = [future.result() for future in futures]
+
+    assert broker.n_requests == 64
+    assert broker.n_batches < 64
+    values, logits = model(observations)
+    for i, (value, logit) in enumerate(results):
+        assert np.allclose(value, values[i], atol=1e-5)
+        assert np.allclose(logit, logits[i], atol=1e-5)
+
+
+def test_mixed_shapes_and_errors():
+    def model(observations):
+        if observations.shape[1] == 3:
+            raise ValueError('Unsupported size.')
+        return observations.reshape(len(observations), -1).sum(axis=1)
+
+    with InferenceBroker(model, max_batch_size=8, max_latency=0.05) as broker:
+        futures = [broker.submit(np.ones((size, size))) for size in (2, 3, 4, 2)]
+        assert [futures[i].result() for i in (0, 2, 3)] == [4, 16, 4]
+        with pytest.raises(ValueError):
+            futures[1].result()
+        # The broker survives a failed batch
+        assert broker.submit(np.ones((1, 1))).result() == 1
+    with pytest.raises(RuntimeError):
+        broker.submit(np.ones((2, 2)))
+    broker.close()
+
+
+def test_cancelled_request():
+    with InferenceBroker(lambda observations: observations.sum(axis=1),
+                         max_batch_size=8, max_latency=0.2) as broker:
+        cancelled = broker.submit(np.ones(2))
+        assert cancelled.cancel()
+        other = broker.submit(np.ones(3))
+        assert other.result(timeout=5) == 3
+        assert broker.n_requests == 1
+        assert broker.submit(np.ones(4)).result(timeout=5) == 4
+
+
+def test_wrong_output_shape():
+    def model(observations):
+        if observations.shape[1] == 2:
+            # A single value for the whole batch
+            return float(observations.sum())
+        return observations.sum(axis=1)
+
+    with InferenceBroker(model, max_batch_size=8, max_latency=0.05) as broker:
+        with pytest.raises(TypeError):
+            broker.submit(np.ones(2)).result(timeout=5)
+        assert broker.submit(np.ones(3)).result(timeout=5) == 3
+
+
+def test_network_player():
+    with InferenceBroker(NumpyMLP(8, seed=0)) as broker:
+        env = GameEnvironment(8, [NetworkPlayer(broker), RandomPlayer()],
+                              {1: (0, 0, 16), 2: (7, 7, 16)}, holes=[(1, 1)])
+        scores = env.play_game()
+    assert scores[1] >= 1
@@ -0,0 +1,90 @@
+"""Tests for the layout registry."""
+
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.grid import neighbour_table
+from battlesheep.engine.layout import LayoutRegistry, get_layout
+
+
+def _attached_sum(handle):
+    layout = LayoutRegistry.attach(handle)
+    try:
+        assert not layout.rays.flags.writeable
+        return int(layout.neighbours.sum()), int(layout.rays.sum())
+    finally:
+        layout.close()
+
+
+def test_layouts_are_computed_once():
+    registry = LayoutRegistry()
+    layout = registry.get(6, [(1, 1)])
+    assert registry.get(6, [(1, 1)]) is layout
+    assert registry.get(6) is not layout
+    assert len(registry) == 2
+
+    board = Board(6, holes=[(1, 1)])
+    assert registry.get_for_state(board.get_state()) is layout
+
+    # Layouts without holes are found by size alone
+    full = registry.get(6)
+    assert registry.get(6, []) is full
+    assert registry.get(6, np.zeros((6, 6), dtype=bool)) is full
+    assert registry.get_for_state(Board(6).get_state()) is full
+
+
+def test_tables():
+    layout = get_layout(Board(5).get_state())
+    table = neighbour_table(5)
+    for x, y, d in [(0, 0, 0), (2, 2, 3), (4, 4, 5)]:
+        nx, ny = table[x, y, d]
+        expected = 25 if nx < 0 else nx * 5 + ny
+        assert layout.neighbours[x * 5 + y, d] == expected
+    assert (layout.rays[:, :, 0] == layout.neighbours[:-1]).all()
+    with pytest.raises(ValueError):
+        layout.neighbours[0, 0] = 0
+
+
+def test_perimeter_and_symmetries():
+    holes = [(2, 2)]
+    layout = LayoutRegistry().get(5, holes)
+    # The hole in the centre is not connected to the outside
+    assert not layout.perimeter[2, 1] and layout.perimeter[0, 0]
+    assert 0 in layout.symmetry_group()
+
+    full = LayoutRegistry().get(1)
+    assert full.symmetry_group() == list(range(len(full.symmetries)))
+
+
+def test_share_and_attach():
+    registry = LayoutRegistry()
+    layout = registry.get(6, [(0, 0), (3, 4)])
+    handle = registry.share(layout)
+    assert registry.share(layout) == handle
+    try:
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(1) as pool:
+            result = pool.apply(_attached_sum, (handle,))
+        assert result == (int(layout.neighbours.sum()), int(layout.rays.sum()))
+    finally:
+        registry.close()
+
+
+def test_install():
+    registry = LayoutRegistry()
+    layout = registry.get(6)
+    handle = registry.share(layout)
+    try:
+        worker = LayoutRegistry()
+        installed = worker.install(handle)
+        assert worker.install(handle) is installed
+        assert worker.get(6) is installed and worker.get(6, []) is installed
+        assert (installed.neighbours == layout.neighbours).all()
+        worker.close()
+        assert len(worker) == 0
+        assert worker.get(6) is not installed
+    finally:
+        registry.close()
@@ -0,0 +1,59 @@
+"""Tests for the match scheduler."""
+
+import pytest
+
+from battlesheep.engine.match import (H0, H1, MatchScheduler, elo_difference,
+                                      expected_score, play_pair, sprt_llr)
+from battlesheep.engine.player import GreedyPlayer, RandomPlayer
+
+
+def always_wins(seed):
+    return 1.0, 1.0
+
+
+def even(seed):
+    # Each player wins the game where it moves first
+    return 1.0, 0.0
+
+
+def test_sprt_llr():
+    assert sprt_llr([], 0, 20) == 0
+    assert sprt_llr([1.0, 0.75, 1.0], 0, 20) > 0
+    assert sprt_llr([0.5, 0.25, 0.5], 0, 20) < 0
+    assert expected_score(0) == 0.5
+    assert elo_difference(expected_score(100)) == pytest.approx(100)
+
+
+def test_early_stop():
+    scheduler = MatchScheduler(play=always_wins, max_pairs=1000, batch_size=4)
+    result = scheduler.run()
+    assert result.decision == H1
+    assert result.n_pairs < 20
+    assert result.wins == 2 * result.n_pairs
+    assert result.elo > 0
+
+    result = MatchScheduler(play=even, max_pairs=1000, batch_size=4).run()
+    assert result.decision == H0
+    assert result.draws == 0 and result.wins == result.losses
+    assert result.elo_interval[0] <= 0 <= result.elo_interval[1]
+
+
+def test_max_pairs():
+    result = MatchScheduler(play=even, elo0=-1000, elo1=1000, max_pairs=6,
+                            batch_size=4).run()
+    assert result.decision is None
+    assert result.n_pairs == 6
+
+
+def test_paired_games():
+    results = play_pair(RandomPlayer, RandomPlayer, seed=3, size=6, n_units=8)
+    assert all(result in (0.0, 0.5, 1.0) for result in results)
+    # Same seed, same games
+    assert play_pair(RandomPlayer, RandomPlayer, seed=3, size=6, n_units=8) == results
+
+
+def test_parallel_match():
+    result = MatchScheduler(GreedyPlayer, RandomPlayer, max_pairs=4, batch_size=4,
+                            n_workers=2, size=6, n_units=8).run()
+    assert result.n_pairs == 4
+    assert result.wins + result.draws + result.losses == 8
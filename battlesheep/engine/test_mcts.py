@@ -0,0 +1,88 @@
+"""Tests for the parallel Monte Carlo tree search."""
+
+import os
+
+import pytest
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.mcts import MCTSPlayer, search_tree, rewards
+from battlesheep.engine.perft import half_splits
+from battlesheep.engine.player import RandomPlayer
+
+
+def make_board():
+    board = Board(6, holes=[(1, 1), (2, 2), (3, 1)])
+    board.initialize_player(1, 0, 0, 8)
+    board.initialize_player(2, 5, 5, 8)
+    return board
+
+
+def test_rewards():
+    board = make_board()
+    assert list(rewards(board.get_state(), 2)) == [0, 0.5, 0.5]
+    board.move_player(1, 0, 0, 1, board.get_actions(1)[0][1])
+    assert list(rewards(board.get_state(), 2)) == [0, 1, 0]
+
+
+def test_search_tree():
+    board = make_board()
+    visits = search_tree(board.get_state(), 1, 2, 200, seed=0)
+    assert sum(visits.values()) == 200
+    for x, y, _, n_units in visits:
+        assert board.player_at(x, y) == 1 and 1 <= n_units < 8
+    assert (board.get_state() == make_board().get_state()).all()
+
+
+@pytest.mark.parametrize('mode', ['root', 'tree'])
+def test_parallel_search(mode):
+    board = make_board()
+    with MCTSPlayer(n_playouts=100, n_workers=2, mode=mode, seed=0) as player:
+        visits = player.search(board.get_state(), 1, 2)
+        # In the shared tree, the first playout starts from the unexpanded root
+        assert sum(visits.values()) == (100 if mode == 'root' else 99)
+        pids = [process.pid for process in player._workers._processes]
+
+        state = board.get_state()
+        actions = board.get_actions(1)
+        (x, y), direction, n_units = player.calculate_move(state, actions)
+        assert ((x, y), direction) in actions and 1 <= n_units < 8
+        # The workers are kept between searches
+        assert [process.pid for process in player._workers._processes] == pids
+    assert player._workers is None
+
+
+def failing_splits(n_units):
+    raise ValueError('No split.')
+
+
+def dying_splits(n_units):
+    # Dies while holding the lock of the tree
+    os._exit(1)
+
+
+def test_search_failures():
+    board = make_board()
+    state, actions = board.get_state(), board.get_actions(1)
+    # The root has more moves than the tree can hold
+    with MCTSPlayer(n_playouts=10, n_workers=2, mode='tree', capacity=2, seed=0) as player:
+        assert player.search(state, 1, 2) == {}
+        (x, y), direction, n_units = player.calculate_move(state, actions)
+        assert ((x, y), direction) in actions and 1 <= n_units < 8
+
+    for unit_splits in (failing_splits, dying_splits):
+        with MCTSPlayer(n_playouts=10, n_workers=2, mode='tree',
+                        unit_splits=unit_splits) as player:
+            with pytest.raises(RuntimeError):
+                player.search(state, 1, 2)
+            # The next search starts new workers
+            player.unit_splits = half_splits
+            assert sum(player.search(state, 1, 2).values()) == 9
+
+
+def test_mcts_game():
+    with MCTSPlayer(n_playouts=20, n_workers=2, mode='tree') as player:
+        env = GameEnvironment(6, [player, RandomPlayer()],
+                              {1: (0, 0, 8), 2: (5, 5, 8)}, holes=[(1, 1), (2, 2)])
+        scores = env.play_game()
+    assert scores[1] >= 1 and scores[2] >= 1
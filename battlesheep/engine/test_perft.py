@@ -0,0 +1,58 @@
+"""Tests for the perft move path counter."""
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.perft import (perft, divide, half_splits,
+    nodes_per_second, find_divergence)
+
+
+def make_board(n_units=4):
+    board = Board(6, holes=[(1, 1), (2, 2), (3, 1)])
+    board.initialize_player(1, 0, 0, n_units)
+    board.initialize_player(2, 5, 5, n_units)
+    return board
+
+
+def test_perft():
+    board = make_board()
+    assert perft(board, [1, 2], 0) == 1
+    n_moves = sum(board.units_at(x, y) - 1 for (x, y), _ in board.get_actions(1))
+    assert perft(board, [1, 2], 1) == n_moves
+    assert perft(board, [1, 2], 3) == perft(board, [1, 2], 3, use_cache=True)
+    assert (board.get_state() == make_board().get_state()).all()
+
+
+def test_finished_game_is_leaf():
+    board = Board(2, holes=[(0, 1), (1, 0), (1, 1)])
+    board.initialize_player(1, 0, 0, 16)
+    assert perft(board, [1], 5) == 1
+
+
+def test_divide():
+    board = make_board()
+    counts = divide(board, [1, 2], 3, half_splits)
+    assert sum(counts.values()) == perft(board, [1, 2], 3, half_splits)
+    assert divide(board, [1, 2], 3, half_splits, processes=2) == counts
+    nodes, nps = nodes_per_second(board, [1, 2], 2)
+    assert nodes == perft(board, [1, 2], 2) and nps > 0
+
+
+class BrokenBoard(Board):
+    """Board whose move generator misses a direction."""
+
+    def get_actions(self, player_id):
+        return [action for action in super().get_actions(player_id)
+            if action[1] != 'DR']
+
+    def copy(self):
+        board = BrokenBoard(self.get_size())
+        board.get_state()[:] = self.get_state()
+        return board
+
+
+def test_find_divergence():
+    board = make_board()
+    assert find_divergence(board, make_board(), [1, 2], 3) is None
+    broken = BrokenBoard(6)
+    broken.get_state()[:] = board.get_state()
+    path = find_divergence(board, broken, [1, 2], 3)
+    assert path is not None and len(path) < 3
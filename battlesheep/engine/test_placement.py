@@ -0,0 +1,73 @@
+"""Tests for the placement phase and opening book."""
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.grid import HexagonalGrid
+from battlesheep.engine.placement import (perimeter_index, legal_start_cells,
+    OpeningBook)
+from battlesheep.engine.player import GreedyPlayer, RandomPlayer
+from battlesheep.engine.symmetry import canonical_form, layout_hash, transform_cube
+
+
+def test_perimeter():
+    board = Board(6, holes=[(2, 2)])
+    perimeter = perimeter_index(board.get_state())
+    assert perimeter.sum() == 20
+    # Cells next to an interior hole are not on the perimeter
+    assert not perimeter[2, 3] and perimeter[0, 0]
+    assert perimeter_index(board.get_state()) is perimeter
+
+    board.initialize_player(1, 0, 0, 16)
+    assert len(legal_start_cells(board.get_state())) == 19
+
+
+def transformed_board(cells, symmetry, shift):
+    grid = HexagonalGrid(8)
+    moved = set()
+    for x, y in cells:
+        q, r, s = transform_cube(*grid.to_cube(x, y), symmetry)
+        moved.add(grid.to_offset(q + shift[0], r + shift[1], s - shift[0] - shift[1]))
+    return Board(8, [(x, y) for x in range(8) for y in range(8) if (x, y) not in moved])
+
+
+def test_canonical_form():
+    cells = [(3, 3), (3, 4), (4, 3), (2, 4), (5, 5)]
+    board = transformed_board(cells, 0, (0, 0))
+    for symmetry, shift in [(1, (0, 0)), (4, (1, -1)), (7, (0, 1)), (11, (-1, 0))]:
+        other = transformed_board(cells, symmetry, shift)
+        assert layout_hash(board.get_state()) == layout_hash(other.get_state())
+    assert layout_hash(board.get_state()) != \
+        layout_hash(transformed_board(cells[:-1], 0, (0, 0)).get_state())
+
+    board.initialize_player(1, 3, 3, 16)
+    form = canonical_form(board.get_state())
+    assert form.from_canonical(*form.to_canonical(3, 3)) == (3, 3)
+    for direction in ['UL', 'UR', 'L', 'R', 'DL', 'DR']:
+        assert form.direction_from_canonical(form.direction_to_canonical(direction)) \
+            == direction
+
+
+def test_opening_book(tmp_path):
+    path = str(tmp_path / 'book.json')
+    book = OpeningBook(path)
+    board = Board(8, holes=[(1, 1)])
+    state = board.get_state()
+    cell = book.choose(state, legal_start_cells(state), 1)
+    assert book.misses == 1
+    assert book.choose(state, legal_start_cells(state), 1) == cell
+    assert book.hits == 1
+    book.save()
+    assert OpeningBook(path).lookup(state, 1) == cell
+
+
+def test_placement_phase():
+    book = OpeningBook()
+    for _ in range(2):
+        env = GameEnvironment(8, [GreedyPlayer(book=book), RandomPlayer()], None,
+                              holes=[(1, 1)], n_units=8)
+        scores = env.play_game()
+        assert set(env.init_dict) == {1, 2}
+        for x, y, n_units in env.init_dict.values():
+            assert n_units == 8 and perimeter_index(env.board.get_state())[x, y]
+        assert scores[1] >= 1 and scores[2] >= 1
+    assert book.hits == 1
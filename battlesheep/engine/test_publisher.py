@@ -0,0 +1,127 @@
+"""Tests for the StatePublisher and StateReader classes."""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from battlesheep.engine import game_environment
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.player import RandomPlayer
+from battlesheep.engine.publisher import StatePublisher, StateReader
+
+
+def _read_until_closed(name):
+    """Returns the sequence numbers read, and whether
+    every frame read was consistent."""
+    reader = StateReader(name)
+    sequences, consistent = [], True
+    try:
+        sequence = 0
+        while not reader.closed:
+            frame = reader.read(sequence)
+            if frame is None:
+                continue
+            sequence, state = frame
+            sequences.append(sequence)
+            # Every published state has the same units everywhere
+            consistent &= bool((state[..., 1] == state[0, 0, 1]).all())
+    finally:
+        reader.close()
+    return sequences, consistent
+
+
+def test_publish_and_read():
+    publisher = StatePublisher(4)
+    reader = StateReader(publisher.name)
+    try:
+        assert reader.size == 4 and publisher.n_readers == 1
+        assert reader.read() is None
+
+        state = np.zeros((4, 4, 2), dtype=np.int8)
+        for units in range(1, 4):
+            state[..., 1] = units
+            publisher.publish(state)
+        # Only the latest state is seen
+        sequence, read = reader.read()
+        assert (read == state).all()
+        assert reader.read(sequence) is None
+
+        publisher.close()
+        assert reader.closed
+    finally:
+        reader.close()
+
+
+def test_concurrent_reader():
+    publisher = StatePublisher(8)
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        result = pool.apply_async(_read_until_closed, (publisher.name,))
+        state = np.zeros((8, 8, 2), dtype=np.int8)
+        for i in range(20000):
+            state[..., 1] = i % 100
+            publisher.publish(state)
+        publisher.close(timeout=30)
+        sequences, consistent = result.get(timeout=30)
+    assert consistent
+    assert sequences == sorted(set(sequences))
+    assert all(sequence % 2 == 0 for sequence in sequences)
+
+
+def test_live_view(monkeypatch):
+    monkeypatch.setenv('MPLBACKEND', 'Agg')
+    env = GameEnvironment(6, [RandomPlayer(), RandomPlayer()],
+                          {1: (0, 0, 8), 2: (5, 5, 8)}, holes=[],
+                          live_view=True, fps=100)
+    start = time.monotonic()
+    scores = env.play_game()
+    # The game does not wait for the viewer to start
+    assert time.monotonic() - start < 2
+    assert scores[1] > 1 and scores[2] > 1
+    assert env._viewer.wait(timeout=60) == 0
+
+
+_HAND_OVER = """
+from battlesheep.engine.publisher import StatePublisher, StateReader
+publisher = StatePublisher(4)
+reader = StateReader(publisher.name)
+publisher.close(unlink=False)
+assert reader.closed and reader.handed_over
+reader.unlink()
+reader.close()
+try:
+    StateReader(publisher.name)
+except FileNotFoundError:
+    pass
+else:
+    raise AssertionError('Buffer not unlinked.')
+"""
+
+
+def test_hand_over():
+    # Run in a fresh process, whose resource tracker reports
+    # unbalanced registrations on stderr
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run([sys.executable, '-c', _HAND_OVER], capture_output=True,
+                            text=True, timeout=60, cwd=root)
+    assert result.returncode == 0, result.stderr
+    assert 'Traceback' not in result.stderr and 'KeyError' not in result.stderr
+
+
+def test_viewer_not_attached(monkeypatch):
+    # A viewer that never attaches must not keep the buffer alive
+    viewers = []
+    def launch_idle_viewer(name, fps):
+        viewers.append(name)
+        return subprocess.Popen([sys.executable, '-c', 'pass'])
+    monkeypatch.setattr(game_environment, 'launch_viewer', launch_idle_viewer)
+    env = GameEnvironment(6, [RandomPlayer(), RandomPlayer()],
+                          {1: (0, 0, 8), 2: (5, 5, 8)}, holes=[], live_view=True)
+    env.play_game()
+    with pytest.raises(FileNotFoundError):
+        StateReader(viewers[0])
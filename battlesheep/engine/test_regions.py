@@ -0,0 +1,59 @@
+"""Tests for the region analysis."""
+
+import random
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.player import RandomPlayer
+from battlesheep.engine.regions import (label_regions, is_separated,
+    greedy_solver, upper_bound_solver, resolve_scores)
+
+
+def test_label_regions():
+    board = Board(4)
+    labels, n_regions = label_regions(board.get_state())
+    assert n_regions == 1
+    assert (labels == 0).all()
+
+    # A wall of holes along the second row splits the board
+    board = Board(4, holes=[(1, y) for y in range(4)])
+    labels, n_regions = label_regions(board.get_state())
+    assert n_regions == 2
+    assert (labels[1] == -1).all()
+    assert len(set(labels[0])) == 1 and len(set(labels[2:].ravel())) == 1
+    assert labels[0, 0] != labels[2, 0]
+
+
+def test_separation():
+    board = Board(4, holes=[(1, y) for y in range(4)])
+    board.initialize_player(1, 0, 0, 4)
+    board.initialize_player(2, 3, 3, 4)
+    assert is_separated(board.get_state())
+
+    board = Board(4)
+    board.initialize_player(1, 0, 0, 4)
+    board.initialize_player(2, 3, 3, 4)
+    assert not is_separated(board.get_state())
+
+
+def test_solvers():
+    board = Board(4, holes=[(1, y) for y in range(4)])
+    board.initialize_player(1, 0, 0, 16)
+    board.initialize_player(2, 3, 3, 2)
+    state = board.get_state()
+    assert greedy_solver(state, 1) == 3
+    assert upper_bound_solver(state, 1) == 3
+    assert greedy_solver(state, 2) == 1
+    assert upper_bound_solver(state, 2) == 1
+    assert resolve_scores(state, 2) == {1: 4, 2: 2}
+
+
+def test_fast_forward():
+    random.seed(0)
+    for _ in range(5):
+        env = GameEnvironment(8, [RandomPlayer(), RandomPlayer()],
+                              {1: (0, 0, 16), 2: (7, 7, 16)},
+                              holes=[(1, 1), (2, 2), (0, 7)], fast_forward=True)
+        scores = env.play_game()
+        assert 1 <= scores[1] <= 16 and 1 <= scores[2] <= 16
+        assert scores[1] + scores[2] <= 61
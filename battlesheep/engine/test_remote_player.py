@@ -0,0 +1,57 @@
+"""Tests for the RemotePlayer class."""
+
+import os
+import time
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.player import Player, RandomPlayer
+from battlesheep.engine.remote_player import RemotePlayer, WorkerPool
+
+
+class SlowPlayer(Player):
+
+    def calculate_move(self, state, actions):
+        time.sleep(10)
+
+
+class CrashingPlayer(Player):
+
+    def calculate_move(self, state, actions):
+        os._exit(1)
+
+
+def play(players):
+    env = GameEnvironment(8, players, {1: (0, 0, 16), 2: (7, 7, 16)},
+                          holes=[(1, 1), (2, 2), (0, 7)])
+    return env.play_game()
+
+
+def test_remote_game():
+    with WorkerPool(n_workers=2) as pool:
+        remote = [RemotePlayer(RandomPlayer(), pool), RemotePlayer(RandomPlayer(), pool)]
+        scores = play(remote)
+        assert scores[1] > 1 and scores[2] > 1
+        assert remote[0].n_fallbacks == 0 and remote[1].n_fallbacks == 0
+        assert pool.n_restarts == 0
+
+
+def test_deadline_and_restart():
+    with WorkerPool(n_workers=1) as pool:
+        slow = RemotePlayer(SlowPlayer(), pool, deadline=0.05)
+        crashing = RemotePlayer(CrashingPlayer(), pool, deadline=5.0)
+        board = Board(8)
+        board.initialize_player(1, 0, 0, 16)
+        state = board.get_state()
+        actions = [((0, 0), 'R')]
+
+        (x, y), direction, n_units = slow.calculate_move(state, actions)
+        assert ((x, y), direction) == ((0, 0), 'R') and 1 <= n_units < 16
+        crashing.calculate_move(state, actions)
+        assert slow.n_fallbacks == 1 and crashing.n_fallbacks == 1
+        assert pool.n_restarts == 2
+
+        # The pool keeps serving after the restarts
+        healthy = RemotePlayer(RandomPlayer(), pool)
+        healthy.calculate_move(state, actions)
+        assert healthy.n_fallbacks == 0
@@ -0,0 +1,43 @@
+"""Tests for the random rollout kernel."""
+
+import numpy as np
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.rollout import rollout
+
+
+def make_board():
+    board = Board(8, holes=[(1, 1), (2, 2), (0, 7)])
+    board.initialize_player(1, 0, 0, 16)
+    board.initialize_player(2, 7, 7, 16)
+    return board
+
+
+def test_rollout_finishes_game():
+    rng = np.random.default_rng(0)
+    reference = make_board()
+    for _ in range(20):
+        board = make_board()
+        scores = rollout(board.get_state(), 1, rng)
+        state = board.get_state()
+        assert board.get_actions(1) == [] and board.get_actions(2) == []
+        for player_id in (1, 2):
+            assert scores[player_id] == board.get_score(player_id)
+            assert state[..., 1][state[..., 0] == player_id].sum() == 16
+        assert ((state[..., 0] == -1) == (reference.get_state()[..., 0] == -1)).all()
+
+
+def test_rollout_is_reproducible():
+    first, second = make_board(), make_board()
+    rollout(first.get_state(), 2, np.random.default_rng(1))
+    rollout(second.get_state(), 2, np.random.default_rng(1))
+    assert (first.get_state() == second.get_state()).all()
+
+
+def test_finished_position():
+    board = make_board()
+    rollout(board.get_state(), 1, np.random.default_rng(0))
+    state = board.get_state().copy()
+    scores = rollout(board.get_state(), 1, np.random.default_rng(0))
+    assert (board.get_state() == state).all()
+    assert scores[1] == board.get_score(1)
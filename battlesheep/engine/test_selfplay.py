@@ -0,0 +1,98 @@
+"""Tests for the filesystem self-play queue."""
+
+import gzip
+import json
+import multiprocessing
+import os
+import time
+
+from battlesheep.engine.selfplay import SelfPlayDriver, Worker
+
+
+def run_worker(root, worker_id):
+    return Worker(root, worker_id, heartbeat=0.2, poll=0.05).run(idle_timeout=60)
+
+
+def test_queue_with_several_workers(tmp_path):
+    root = str(tmp_path)
+    driver = SelfPlayDriver(root, heartbeat_timeout=10)
+    job_ids = driver.submit(['random', 'greedy'], n_games=12, games_per_job=2,
+                            size=6, n_units=8, seed=100)
+    assert len(job_ids) == 6 and driver.status()['pending'] == 6
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(3) as pool:
+        results = [pool.apply_async(run_worker, (root, f'worker{i}')) for i in range(3)]
+        assert driver.wait(timeout=120, poll=0.05) == 12
+        driver.stop()
+        n_jobs = [result.get(timeout=60) for result in results]
+
+    assert sum(n_jobs) == 6
+    status = driver.status()
+    assert status['done'] == status['merged'] == 6
+    assert status['pending'] == status['claimed'] == status['results'] == 0
+    games = driver.read_games()
+    assert sorted(game['seed'] for game in games) == list(range(100, 112))
+    assert all(game['players'] == ['random', 'greedy'] for game in games)
+    assert driver.merge() == []
+
+
+def test_reclaim_abandoned_job(tmp_path):
+    root = str(tmp_path)
+    driver = SelfPlayDriver(root, heartbeat_timeout=1)
+    driver.submit(['random', 'random'], n_games=2, games_per_job=2, size=6, n_units=8)
+
+    # A worker claims the job and dies without a heartbeat
+    dead = Worker(root, 'dead')
+    claimed = dead.claim()
+    assert claimed is not None and dead.claim() is None
+    assert driver.reclaim() == 0
+    past = time.time() - 5
+    os.utime(claimed, (past, past))
+    assert driver.reclaim() == 1
+    # Its results are discarded if it comes back
+    assert not dead.run_job(claimed)
+
+    worker = Worker(root, 'alive')
+    assert worker.run(max_jobs=1) == 1
+    shard = os.path.join(root, 'results', os.listdir(os.path.join(root, 'results'))[0])
+    with gzip.open(shard, 'rt') as f:
+        assert len([json.loads(line) for line in f]) == 2
+    assert len(driver.merge()) == 2
+    assert len(driver.read_games()) == 2
+
+
+def test_merge_after_crash(tmp_path):
+    root = str(tmp_path)
+    driver = SelfPlayDriver(root)
+    driver.submit(['random', 'random'], n_games=2, games_per_job=2, size=6, n_units=8)
+    assert Worker(root, 'worker').run(max_jobs=1) == 1
+    assert len(driver.merge()) == 2
+
+    # Crash after appending the records, before moving the
+    # shard, while appending a further record
+    name = os.listdir(os.path.join(root, 'merged'))[0]
+    os.rename(os.path.join(root, 'merged', name), os.path.join(root, 'results', name))
+    with open(driver.games_path, 'a') as f:
+        f.write('{"job": ')
+
+    driver = SelfPlayDriver(root)
+    assert driver.merge() == []
+    assert len(driver.read_games()) == 2
+    assert driver.status()['results'] == 0 and driver.status()['merged'] == 1
+
+
+def test_submit_after_stop(tmp_path):
+    root = str(tmp_path)
+    driver = SelfPlayDriver(root)
+    driver.submit(['random', 'random'], n_games=2, games_per_job=2, size=6, n_units=8)
+    assert Worker(root, 'first').run(max_jobs=1) == 1
+    driver.stop()
+    assert Worker(root, 'stopped').run(idle_timeout=0) == 0
+
+    # A new batch runs on workers started after it
+    driver.submit(['random', 'random'], n_games=2, games_per_job=2, size=6, n_units=8,
+                  seed=2)
+    assert Worker(root, 'second').run(idle_timeout=0) == 1
+    assert driver.wait(timeout=10, poll=0.05) == 4
+    assert sorted(game['seed'] for game in driver.read_games()) == [0, 1, 2, 3]
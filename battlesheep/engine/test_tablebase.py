@@ -0,0 +1,93 @@
+"""Tests for the tablebase generator."""
+
+import random
+
+import numpy as np
+import pytest
+
+from battlesheep.engine.board import Board
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.player import RandomPlayer
+from battlesheep.engine.tablebase import (TablebasePlayer, build_tablebase,
+                                          perfect_hash, tile_layout)
+
+
+# Two basic tiles of tiling.py side by side
+CELLS = [(0, 0, 0), (0, -1, 1), (1, -1, 0), (1, 0, -1),
+         (2, 0, -2), (2, -1, -1), (3, -1, -2), (3, 0, -3)]
+
+
+def negamax(board, to_move):
+    """Returns the final cell difference for the player
+    to move under perfect play, by brute force."""
+    other = to_move % 2 + 1
+    actions = board.get_actions(to_move)
+    if not actions:
+        if not board.get_actions(other):
+            return board.get_score(to_move) - board.get_score(other)
+        return -negamax(board, other)
+    best = None
+    for (x, y), direction in actions:
+        for n_units in range(1, board.units_at(x, y)):
+            child = board.copy()
+            child.move_player(to_move, x, y, n_units, direction)
+            value = -negamax(child, other)
+            best = value if best is None else max(best, value)
+    return best
+
+
+@pytest.fixture(scope='module')
+def tablebase(tmp_path_factory):
+    size, holes = tile_layout(CELLS)
+    return build_tablebase(str(tmp_path_factory.mktemp('tablebase')), size, holes, n_units=3)
+
+
+def test_tile_layout():
+    size, holes = tile_layout(CELLS)
+    assert size * size - len(holes) == len(CELLS)
+
+
+def test_perfect_hash():
+    keys = [bytes([i % 256, i // 256, 7]) for i in range(3000)]
+    displacements, n_slots, slots = perfect_hash(keys)
+    assert len(set(slots)) == len(keys)
+    assert max(slots) < n_slots
+
+
+def test_probe_matches_search(tablebase):
+    size, holes = tile_layout(CELLS)
+    random.seed(0)
+    for _ in range(5):
+        board = Board(size, holes)
+        cells = [(x, y) for x in range(size) for y in range(size) if not board.is_hole(x, y)]
+        first, second = random.sample(cells, 2)
+        board.initialize_player(1, *first, 3)
+        board.initialize_player(2, *second, 3)
+        entry = tablebase.probe(board.get_state(), 1)
+        assert entry.value == negamax(board, 1)
+        if entry.move is not None:
+            (x, y), direction, n_units = entry.move
+            assert ((x, y), direction) in board.get_actions(1)
+            board.move_player(1, x, y, n_units, direction)
+            assert tablebase.probe(board.get_state(), 2).value == -entry.value
+
+
+def test_unknown_positions(tablebase):
+    size, holes = tile_layout(CELLS)
+    board = Board(size, holes)
+    x, y = np.argwhere(board.get_state()[..., 0] == 0)[0]
+    board.initialize_player(1, x, y, 9)
+    assert tablebase.probe(board.get_state(), 1) is None
+    assert tablebase.probe(Board(size + 1).get_state(), 1) is None
+
+
+def test_perfect_player(tablebase):
+    size, holes = tile_layout(CELLS)
+    random.seed(1)
+    for _ in range(5):
+        env = GameEnvironment(size, [TablebasePlayer(tablebase), RandomPlayer()], None,
+                              holes, n_units=3)
+        env._initialise()
+        value = tablebase.probe(env.board.get_state(), 1).value
+        scores = env.play_game()
+        assert scores[1] - scores[2] >= value
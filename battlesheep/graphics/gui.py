@@ -1,12 +1,13 @@
 """Functions to plot the board."""
 
-from typing import Tuple
+from typing import Optional, Tuple
 
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.patches import RegularPolygon
 
 from ..engine.board import Board
+from ..engine.layout import get_layout
 
 
 player_colors = {
@@ -20,6 +21,7 @@ class BoardGUI:
 
     def __init__(self, board: Board) -> None:
         self.board_size = board.get_size()
+        self._layout = get_layout(board.get_state())
         self.fig, self.ax = self._init_canvas(board.get_size())
         self._draw_board(board)
 
@@ -42,33 +44,33 @@ class BoardGUI:
                 if board.is_hole(x, y):
                     color = 'w'
                     edgecolor = 'w'
-                elif board.is_empty(x, y):
+                else:
+                    # Occupied cells are coloured by update_view
                     color = 'gray'
                     edgecolor = 'k'
 
-                if y % 2 != 0:
-                    x_ = x
-                else:
-                    x_ = x + .5
+                x_, y_ = self._layout.pixels[x, y]
 
-                hex = RegularPolygon((x_, y), numVertices=6, radius=.5, 
+                hex = RegularPolygon((x_, y_), numVertices=6, radius=.5, 
                                     orientation=np.radians(120), 
                                     facecolor=color, alpha=0.2, edgecolor=edgecolor)
-                text = self.ax.text(x_, y, '', ha='center', va='center', color='k')
+                text = self.ax.text(x_, y_, '', ha='center', va='center', color='k')
                 self._board.append(hex)
                 self._labels.append(text)
                 self.ax.add_patch(hex)
 
-    def update_view(self, board: Board) -> None:
-        """Update the view of the board."""
+    def update_view(self, board: Board, pause: Optional[float] = 1.0) -> None:
+        """Update the view of the board, then pause for
+        the given number of seconds, if any."""
 
         for x in np.arange(self.board_size):
             for y in np.arange(self.board_size):
                 if not board.is_empty(x, y) and not board.is_hole(x, y):
                     player = board.player_at(x, y)
                     color = player_colors[player]
-                    self._board[x + y * self.board_size].set_facecolor(color)
-                    self._labels[x + y * self.board_size].set_text(board.units_at(x, y))
+                    self._board[x * self.board_size + y].set_facecolor(color)
+                    self._labels[x * self.board_size + y].set_text(board.units_at(x, y))
         
         self.fig.canvas.draw()
-        plt.pause(1.0)
\ No newline at end of file
+        if pause is not None:
+            plt.pause(pause)
\ No newline at end of file
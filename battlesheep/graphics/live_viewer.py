@@ -0,0 +1,69 @@
+"""Live viewer of a game published in shared memory.
+
+Usage:
+
+    python -m battlesheep.graphics.live_viewer <name> --fps 10
+"""
+
+import argparse
+import time
+from typing import List
+
+import matplotlib.pyplot as plt
+
+from ..engine.board import Board
+from ..engine.publisher import StateReader
+from .gui import BoardGUI
+
+
+def run_viewer(name: str, fps: float = 10.0, track: bool = True) -> int:
+    """Shows the states published under the given name
+    until the publisher is closed, polling at most fps
+    times per second. States published between two
+    frames are skipped. Unlinks the buffer if the
+    publisher handed it over. Returns the number of
+    frames drawn, zero if the buffer is already gone."""
+    try:
+        reader = StateReader(name, track)
+    except FileNotFoundError:
+        return 0
+    interval = 1.0 / fps
+    gui, sequence, n_frames = None, 0, 0
+    try:
+        while True:
+            start = time.perf_counter()
+            closed = reader.closed
+            frame = reader.read(sequence)
+            if frame is not None:
+                sequence, state = frame
+                board = Board.from_state(state)
+                if gui is None:
+                    gui = BoardGUI(board)
+                gui.update_view(board, pause=None)
+                n_frames += 1
+            if closed:
+                if reader.handed_over:
+                    reader.unlink()
+                break
+            remaining = interval - (time.perf_counter() - start)
+            if gui is not None:
+                plt.pause(max(remaining, 1e-3))
+            elif remaining > 0:
+                time.sleep(remaining)
+    finally:
+        reader.close()
+    return n_frames
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Live viewer of a battlesheep game.')
+    parser.add_argument('name', help='name of the shared memory buffer')
+    parser.add_argument('--fps', type=float, default=10.0, help='frames per second')
+    args = parser.parse_args(argv)
+    if run_viewer(args.name, args.fps, track=False):
+        # Keep the final position on screen until the window is closed
+        plt.show()
+
+
+if __name__ == '__main__':
+    main()
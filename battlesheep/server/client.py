@@ -0,0 +1,58 @@
+"""Client connecting an in-process player to a
+GameServer."""
+
+import asyncio
+from typing import Dict
+
+import numpy as np
+
+from ..engine.player import Player
+from .game_server import encode_message, decode_message
+
+
+async def play_remote(player: Player, n_games: int = 1, path: str = None,
+                      host: str = '127.0.0.1', port: int = None) -> Dict[int, dict]:
+    """Joins n_games seats on the server and plays
+    them with the given player. Returns the final
+    scores of every game, keyed by game id, or
+    {'error': message} for games failing on the
+    server."""
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    for _ in range(n_games):
+        writer.write(encode_message({'type': 'join'}))
+    await writer.drain()
+
+    results, n_finished = {}, 0
+    try:
+        while n_finished < n_games:
+            line = await reader.readline()
+            if not line:
+                break
+            message = decode_message(line)
+            if message['type'] == 'turn':
+                state = np.array(message['state'], dtype=np.int8)
+                actions = [((x, y), direction)
+                    for x, y, direction in message['actions']]
+                (x, y), direction, n_units = player.calculate_move(state, actions)
+                writer.write(encode_message({
+                    'type': 'move', 'game': message['game'],
+                    'player': message['player'], 'origin': [int(x), int(y)],
+                    'direction': direction, 'n_units': int(n_units),
+                }))
+                await writer.drain()
+            elif message['type'] == 'end':
+                # The same connection may hold several seats of a game
+                n_finished += 1
+                if 'error' in message:
+                    results[message['game']] = {'error': message['error']}
+                    continue
+                results[message['game']] = {
+                    int(player_id): score
+                    for player_id, score in message['scores'].items()}
+    finally:
+        writer.close()
+    return results
@@ -0,0 +1,349 @@
+"""Asyncio server hosting many concurrent games
+over a local socket.
+
+Remote players talk to the server using a JSON-lines
+protocol. Every message is a single JSON object
+terminated by a newline:
+
+    client -> server
+        {"type": "join"}
+        {"type": "move", "game": G, "player": P,
+         "origin": [x, y], "direction": "R", "n_units": 3}
+
+    server -> client
+        {"type": "start", "game": G, "player": P}
+        {"type": "turn", "game": G, "player": P, "deadline": 1.0,
+         "state": [...], "actions": [[x, y, "R"], ...]}
+        {"type": "end", "game": G, "player": P, "scores": {"1": 10, ...}}
+        {"type": "end", "game": G, "player": P, "scores": {},
+         "error": "..."}
+
+A single connection may join several games at once;
+every message carries the game and seat it refers to.
+A game failing on the server ends with an error and
+no scores."""
+
+import asyncio
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..engine.game_environment import GameEnvironment
+
+
+Move = Tuple[Tuple[int, int], str, int]
+
+
+def encode_message(message: dict) -> bytes:
+    """Encodes a message as a JSON line."""
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode()
+
+
+def decode_message(line: bytes) -> dict:
+    """Decodes a JSON line into a message."""
+    return json.loads(line)
+
+
+def _run_batch(jobs: List[Tuple[Callable, tuple]]) -> List[Tuple[bool, object]]:
+    """Runs a batch of engine jobs, capturing exceptions
+    so that one failing game does not affect the others."""
+    results = []
+    for fn, args in jobs:
+        try:
+            results.append((True, fn(*args)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+class _EngineBatcher:
+    """Gathers the engine steps submitted by all games
+    during one iteration of the event loop and runs
+    them in batches on a thread pool."""
+
+    def __init__(self, executor: ThreadPoolExecutor, max_batch_size: int) -> None:
+        self._executor = executor
+        self._max_batch_size = max_batch_size
+        self._pending = []
+        self._scheduled = False
+
+    def submit(self, fn: Callable, *args) -> asyncio.Future:
+        """Schedules fn(*args) on the thread pool."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((fn, args, future))
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._flush)
+        return future
+
+    def _flush(self) -> None:
+        loop = asyncio.get_running_loop()
+        pending, self._pending = self._pending, []
+        self._scheduled = False
+        for start in range(0, len(pending), self._max_batch_size):
+            chunk = pending[start:start+self._max_batch_size]
+            jobs = [(fn, args) for fn, args, _ in chunk]
+            batch = loop.run_in_executor(self._executor, _run_batch, jobs)
+            batch.add_done_callback(
+                lambda batch, chunk=chunk: self._distribute(batch, chunk))
+
+    @staticmethod
+    def _distribute(batch: asyncio.Future, chunk: list) -> None:
+        if batch.exception() is not None:
+            results = [(False, batch.exception())] * len(chunk)
+        else:
+            results = batch.result()
+        for (_, _, future), (ok, result) in zip(chunk, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+
+
+def _observe(env: GameEnvironment, player_id: int) -> Optional[tuple]:
+    """Returns the observation of the given player,
+    or None if the player cannot move."""
+    actions = env._get_actions(player_id)
+    if not actions:
+        return None
+    return env._get_state().copy(), actions
+
+
+def _apply_move(env: GameEnvironment, player_id: int, move: Optional[Move],
+                state: np.ndarray, actions: list) -> None:
+    """Applies the move of the given player, falling back
+    to the in-process player of the seat if the move
+    is missing or illegal."""
+    if move is None or not _is_legal(state, actions, move):
+        move = env.players[player_id-1].calculate_move(state, actions)
+    (x, y), direction, n_units = move
+    env._make_move(player_id, x, y, n_units, direction)
+
+
+def _is_legal(state: np.ndarray, actions: list, move: Move) -> bool:
+    """Returns True if the move is one of the actions
+    and splits the stack properly."""
+    (x, y), direction, n_units = move
+    if ((x, y), direction) not in actions:
+        return False
+    return 1 <= n_units < state[x, y, 1]
+
+
+def _parse_move(message: dict) -> Optional[Move]:
+    """Returns the move contained in a message, or
+    None if the message is malformed."""
+    try:
+        x, y = message['origin']
+        return (int(x), int(y)), str(message['direction']), int(message['n_units'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class _Connection:
+    """Connection to a remote client, which may hold
+    seats in several games. A client that does not read
+    its messages within timeout seconds is
+    disconnected."""
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, timeout: float = None) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.closed = False
+        self._pending = {}
+
+    async def send(self, message: dict) -> None:
+        """Sends a message to the client, waiting for the
+        write buffer to drain."""
+        if self.closed:
+            return
+        self.writer.write(encode_message(message))
+        try:
+            await asyncio.wait_for(self.writer.drain(), self.timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.close()
+
+    def expect_move(self, game_id: int, player_id: int) -> asyncio.Future:
+        """Returns a future resolved with the next
+        move sent for the given seat."""
+        future = asyncio.get_running_loop().create_future()
+        if self.closed:
+            future.set_result(None)
+        else:
+            self._pending[game_id, player_id] = future
+        return future
+
+    def resolve_move(self, message: dict) -> None:
+        future = self._pending.pop((message.get('game'), message.get('player')), None)
+        if future is not None and not future.done():
+            future.set_result(_parse_move(message))
+
+    def close(self) -> None:
+        self.closed = True
+        for future in self._pending.values():
+            if not future.done():
+                future.set_result(None)
+        self._pending.clear()
+        self.writer.close()
+
+
+class GameServer:
+    """Server hosting many concurrent games. Clients
+    join with a "join" message and are seated in a new
+    game as soon as enough players are waiting.
+
+    Games are created by game_factory, which returns a
+    fresh GameEnvironment. Its in-process players are
+    used as fallbacks when a remote player does not
+    reply before the deadline or sends an illegal move."""
+
+    def __init__(self, game_factory: Callable[[], GameEnvironment],
+                 n_players: int = 2, deadline: float = 1.0,
+                 max_workers: int = 4, max_batch_size: int = 64) -> None:
+        assert n_players >= 1
+        self.game_factory = game_factory
+        self.n_players = n_players
+        self.deadline = deadline
+        self.results = {}
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._engine = _EngineBatcher(self._executor, max_batch_size)
+        self._game_ids = itertools.count()
+        self._waiting = []
+        self._games = set()
+        self._connections = set()
+        self._server = None
+        self._finished = asyncio.Condition()
+
+    async def start(self, path: str = None, host: str = '127.0.0.1',
+                    port: int = 0) -> object:
+        """Starts listening on a unix socket if a path
+        is given, and on a TCP socket otherwise. Returns
+        the address the server is bound to."""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, path=path)
+            return path
+        self._server = await asyncio.start_server(
+            self._handle_connection, host=host, port=port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self) -> None:
+        """Serves clients until cancelled."""
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stops the server and cancels running games."""
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._games):
+            task.cancel()
+        await asyncio.gather(*self._games, return_exceptions=True)
+        for connection in list(self._connections):
+            connection.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    async def wait_for_games(self, n_games: int) -> Dict[int, dict]:
+        """Waits until n_games games have finished or
+        failed and returns their scores."""
+        async with self._finished:
+            await self._finished.wait_for(lambda: len(self.results) >= n_games)
+        return self.results
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        connection = _Connection(reader, writer, self.deadline)
+        self._connections.add(connection)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = decode_message(line)
+                except ValueError:
+                    continue
+                if message.get('type') == 'join':
+                    self._join(connection)
+                elif message.get('type') == 'move':
+                    connection.resolve_move(message)
+        except ConnectionError:
+            pass
+        finally:
+            self._waiting = [c for c in self._waiting if c is not connection]
+            self._connections.discard(connection)
+            connection.close()
+
+    def _join(self, connection: _Connection) -> None:
+        """Seats the connection, starting a new game
+        if enough players are waiting."""
+        self._waiting.append(connection)
+        while len(self._waiting) >= self.n_players:
+            seats = self._waiting[:self.n_players]
+            self._waiting = self._waiting[self.n_players:]
+            task = asyncio.create_task(self._run_game(next(self._game_ids), seats))
+            self._games.add(task)
+            task.add_done_callback(self._games.discard)
+
+    async def _request_move(self, seat: _Connection, game_id: int,
+                            player_id: int, state: np.ndarray,
+                            actions: list) -> Optional[Move]:
+        """Sends the observation to the seat and waits
+        for its move until the deadline."""
+        future = seat.expect_move(game_id, player_id)
+        await seat.send({
+            'type': 'turn', 'game': game_id, 'player': player_id,
+            'deadline': self.deadline, 'state': state.tolist(),
+            'actions': [[int(x), int(y), d] for (x, y), d in actions],
+        })
+        try:
+            return await asyncio.wait_for(future, self.deadline)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _run_game(self, game_id: int, seats: List[_Connection]) -> None:
+        """Plays the game and records its scores in
+        results, or {'error': message} if it failed."""
+        try:
+            scores = await self._play(game_id, seats)
+            end = {'scores': scores}
+        except Exception as e:
+            scores = {'error': repr(e)}
+            end = {'scores': {}, 'error': repr(e)}
+        for player_id, seat in enumerate(seats, 1):
+            await seat.send({'type': 'end', 'game': game_id, 'player': player_id, **end})
+        async with self._finished:
+            self.results[game_id] = scores
+            self._finished.notify_all()
+
+    async def _play(self, game_id: int, seats: List[_Connection]) -> Dict[int, int]:
+        env = await self._engine.submit(self.game_factory)
+        await self._engine.submit(env._initialise)
+        for player_id, seat in enumerate(seats, 1):
+            await seat.send({'type': 'start', 'game': game_id, 'player': player_id})
+
+        moved = True
+        while moved:
+            moved = False
+            for player_id, seat in enumerate(seats, 1):
+                observation = await self._engine.submit(_observe, env, player_id)
+                if observation is None:
+                    continue
+                state, actions = observation
+                move = await self._request_move(seat, game_id, player_id,
+                                                state, actions)
+                await self._engine.submit(_apply_move, env, player_id,
+                                          move, state, actions)
+                moved = True
+
+        return {player_id: int(score)
+            for player_id, score in env._get_scores().items()}
@@ -0,0 +1,118 @@
+"""Tests for the GameServer class."""
+
+import asyncio
+import os
+import tempfile
+
+from battlesheep.engine.game_environment import GameEnvironment
+from battlesheep.engine.player import RandomPlayer
+from battlesheep.server.game_server import GameServer, _Connection
+from battlesheep.server.client import play_remote
+
+
+def make_game():
+    return GameEnvironment(
+        8, [RandomPlayer(), RandomPlayer()],
+        {1: (0, 0, 16), 2: (7, 7, 16)},
+        holes=[(1, 1), (2, 2), (0, 7)])
+
+
+def test_many_games():
+
+    async def run():
+        server = GameServer(make_game, n_players=2, deadline=1.0)
+        host, port = await server.start()
+        clients = [play_remote(RandomPlayer(), n_games=5, host=host, port=port)
+            for _ in range(4)]
+        client_results = await asyncio.gather(*clients)
+        results = await server.wait_for_games(10)
+        await server.close()
+        return client_results, results
+
+    client_results, results = asyncio.run(run())
+    assert len(results) == 10
+    for scores in results.values():
+        assert set(scores) == {1, 2}
+        assert scores[1] >= 1 and scores[2] >= 1
+    for scores in client_results:
+        assert 3 <= len(scores) <= 5
+
+
+def test_unix_socket_and_fallback():
+
+    async def silent_client(path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(b'{"type": "join"}\n')
+        await writer.drain()
+        # Never reply to turns, the server must fall back
+        while await reader.readline():
+            pass
+
+    async def run(path):
+        server = GameServer(make_game, n_players=2, deadline=0.01)
+        await server.start(path=path)
+        silent = asyncio.create_task(silent_client(path))
+        await play_remote(RandomPlayer(), n_games=1, path=path)
+        results = await server.wait_for_games(1)
+        silent.cancel()
+        await server.close()
+        return results
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(run(os.path.join(tmp, 'server.sock')))
+    assert len(results) == 1
+    assert results[0][1] > 1 and results[0][2] > 1
+
+
+def test_failing_game():
+
+    def broken_game():
+        raise RuntimeError('No board.')
+
+    async def run():
+        server = GameServer(broken_game, n_players=2, deadline=1.0)
+        host, port = await server.start()
+        clients = [play_remote(RandomPlayer(), n_games=1, host=host, port=port)
+            for _ in range(2)]
+        client_results = await asyncio.wait_for(asyncio.gather(*clients), 10)
+        results = await asyncio.wait_for(server.wait_for_games(1), 10)
+        await server.close()
+        return client_results, results
+
+    client_results, results = asyncio.run(run())
+    assert 'No board.' in results[0]['error']
+    for scores in client_results:
+        assert 'No board.' in scores[0]['error']
+
+
+def test_stalled_client():
+
+    class StalledWriter:
+        """Writer whose buffer never drains."""
+
+        def __init__(self):
+            self.n_writes = 0
+            self.closed = False
+
+        def write(self, data):
+            self.n_writes += 1
+
+        async def drain(self):
+            await asyncio.Event().wait()
+
+        def close(self):
+            self.closed = True
+
+    async def run():
+        writer = StalledWriter()
+        connection = _Connection(None, writer, timeout=0.01)
+        future = connection.expect_move(0, 1)
+        await connection.send({'type': 'start', 'game': 0, 'player': 1})
+        # The stalled client is dropped instead of buffering more messages
+        await connection.send({'type': 'end', 'game': 0, 'player': 1, 'scores': {}})
+        return writer, connection, future
+
+    writer, connection, future = asyncio.run(run())
+    assert connection.closed and writer.closed
+    assert writer.n_writes == 1
+    assert future.result() is None